@@ -0,0 +1,152 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import profiling
+from decoder import Decoder
+from misb0601_decoder import (decode_misb0601_item, get_lookup_table, lookup_table_keys, misb0601_key_names,
+                              uas_lds_key)
+from sqlite_sink import SQLiteSink
+
+# Run in a fresh interpreter by benchmark_startup
+_STARTUP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+from klvParser import KLVParser
+imported = time.perf_counter()
+with open(sys.argv[1], 'rb') as f:
+    data = f.read(int(sys.argv[3]))
+next(KLVParser(data, bytes.fromhex(sys.argv[2])).decode_iter(), None)
+decoded = time.perf_counter()
+print(imported - start, decoded - imported)
+'''
+
+
+def benchmark_lookup_tables(number=100000):
+    """
+    Compare per-key decode time of the lookup-table mode against the arithmetic decoders.
+
+    Each key is timed on a random value of its usual width (1 byte for the small
+    airspeed/humidity style fields, 2 bytes otherwise). Table construction is done
+    before timing, so the numbers reflect steady-state decoding.
+
+    :param number: The number of decodes timed per key and mode.
+    :return: A list of (key, name, arithmetic_ns, table_ns) tuples.
+    """
+    one_byte_keys = {8, 9, 34, 36, 39, 43, 44, 55, 56, 65}
+    results = []
+
+    for key in sorted(lookup_table_keys):
+        value = os.urandom(1 if key in one_byte_keys else 2)
+        get_lookup_table(key, len(value))
+
+        arithmetic = timeit.timeit(lambda: decode_misb0601_item(key, value), number=number)
+        table = timeit.timeit(lambda: decode_misb0601_item(key, value, True), number=number)
+        results.append((
+            key,
+            misb0601_key_names.get(key, f"Unknown Key {key}"),
+            arithmetic / number * 1e9,
+            table / number * 1e9,
+        ))
+
+    return results
+
+
+def profile_decode(rawBinary, key, use_lookup_tables=False, use_templates=True):
+    """
+    Decode a recording with per-tag profiling enabled.
+
+    :param rawBinary: The raw binary data containing one or more KLV packets.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param use_lookup_tables: See Decoder.
+    :param use_templates: See Decoder.
+    :return: The DecodeProfiler holding the per-tag statistics.
+    """
+    decoder = Decoder(key, use_lookup_tables, use_templates)
+    profiler = profiling.enable_profiling()
+    try:
+        for packetNum, packet in decoder.decode_iter(rawBinary):
+            pass
+    finally:
+        profiling.disable_profiling()
+    return profiler
+
+
+def benchmark_startup(path, key=uas_lds_key, runs=5, read_size=1 << 16):
+    """
+    Measure the import time of the parser and the latency of the first decoded packet,
+    as seen by a short-lived process. Each run starts a new interpreter.
+
+    :param path: The path of a recording whose first packet is decoded.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param runs: The number of interpreters started.
+    :param read_size: The number of bytes read from the start of the recording.
+    :return: A dictionary with the median 'import_ms' and 'first_packet_ms'.
+    """
+    import_times = []
+    first_packet_times = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _STARTUP_SCRIPT, path, bytes(key).hex(), str(read_size)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout
+        import_seconds, first_packet_seconds = map(float, output.split())
+        import_times.append(import_seconds * 1e3)
+        first_packet_times.append(first_packet_seconds * 1e3)
+    return {
+        'import_ms': statistics.median(import_times),
+        'first_packet_ms': statistics.median(first_packet_times),
+    }
+
+
+def benchmark_sqlite_sink(rawBinary, key=uas_lds_key, use_templates=True, batch_size=5000):
+    """
+    Compare the throughput of the SQLite sink with the decode throughput feeding it.
+
+    The recording is decoded once, timed, and the decoded packets are then written to a
+    new database in a temporary directory, timed separately and including the final
+    index build. A sink that keeps up writes at least as many packets per second as
+    are decoded.
+
+    :param rawBinary: The raw binary data containing one or more KLV packets.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param use_templates: See Decoder.
+    :param batch_size: See SQLiteSink.
+    :return: A dictionary with the 'packets' count and the 'decode_packets_per_second' and
+        'sink_packets_per_second' rates.
+    """
+    decoder = Decoder(key, False, use_templates)
+    start = time.perf_counter()
+    packets = list(decoder.decode_iter(rawBinary))
+    decode_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        with SQLiteSink(os.path.join(directory, 'benchmark.db'), batch_size=batch_size) as sink:
+            sink.write_all(packets)
+        sink_seconds = time.perf_counter() - start
+
+    return {
+        'packets': len(packets),
+        'decode_packets_per_second': len(packets) / decode_seconds if decode_seconds > 0 else 0.0,
+        'sink_packets_per_second': len(packets) / sink_seconds if sink_seconds > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    print(f"{'Key':>4}  {'Name':<40} {'Arithmetic ns':>14} {'Table ns':>10} {'Speedup':>8}")
+    for key, name, arithmetic_ns, table_ns in benchmark_lookup_tables():
+        print(f"{key:>4}  {name:<40} {arithmetic_ns:>14.1f} {table_ns:>10.1f} {arithmetic_ns / table_ns:>7.1f}x")
+
+    if len(sys.argv) > 1:
+        startup = benchmark_startup(sys.argv[1])
+        print(f"\nImport: {startup['import_ms']:.1f} ms, first packet: {startup['first_packet_ms']:.1f} ms")
+
+        with open(sys.argv[1], 'rb') as f:
+            sink = benchmark_sqlite_sink(f.read())
+        print(f"SQLite sink: {sink['packets']} packets, decode {sink['decode_packets_per_second']:.0f} packets/s, "
+              f"sink {sink['sink_packets_per_second']:.0f} packets/s")
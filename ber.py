@@ -0,0 +1,23 @@
+def read_ber_length(data, offset, end):
+    """
+    Read a BER encoded length field without copying the data it is read from.
+
+    :param data: The raw binary data containing the length field.
+    :param offset: The offset of the first byte of the length field.
+    :param end: The offset past which the length field may not extend.
+    :return: A tuple (length, length_of_length_field), or None if the field is cut off by end.
+    """
+    if offset >= end:
+        return None
+
+    first_byte = data[offset]
+    # If the high bit is not set, the length fits in one byte
+    if first_byte & 0x80 == 0:
+        return first_byte, 1
+
+    # If the high bit is set, next 'num_length_bytes' bytes form the length
+    num_length_bytes = first_byte & 0x7F
+    if offset + 1 + num_length_bytes > end:
+        return None
+    length = int.from_bytes(data[offset + 1:offset + 1 + num_length_bytes], byteorder='big')
+    return length, 1 + num_length_bytes
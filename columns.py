@@ -0,0 +1,116 @@
+import numpy as np
+
+from decoder import StreamState
+from misb0601_decoder import decode_misb0601_item
+
+
+def read_columns(decoder, data, keys, state=None):
+    """
+    Decode selected numeric MISB0601 fields of every packet into NumPy columns.
+
+    Only the requested keys are decoded; every other item of a packet is skipped after
+    tokenizing. Packets missing a field get NaN in that column.
+
+    :param decoder: The Decoder used to find and validate packets.
+    :param data: A bytes or bytearray buffer holding the stream data.
+    :param keys: The MISB0601 keys to decode.
+    :param state: The StreamState of the stream. A new one is used, and data is taken to
+        hold the whole recording, if omitted.
+    :return: A dictionary with 'packet_number', 'offset' and 'end' int64 arrays and a
+        float64 array per requested key.
+    """
+    complete = state is None
+    if state is None:
+        state = StreamState()
+    keys = tuple(keys)
+    wanted = frozenset(keys)
+    use_lookup_tables = decoder.use_lookup_tables
+    nan = float('NaN')
+
+    packet_numbers = []
+    offsets = []
+    ends = []
+    rows = []
+    for packetNum, groupStartIndex, endIndex, items in decoder.iter_packets(data, state, complete):
+        values = dict.fromkeys(keys, nan)
+        for item in items:
+            key = item['key']
+            if key in wanted:
+                values[key] = decode_misb0601_item(key, item['value'], use_lookup_tables)
+        packet_numbers.append(packetNum)
+        offsets.append(state.base_offset + groupStartIndex)
+        ends.append(state.base_offset + endIndex)
+        rows.append([values[key] for key in keys])
+
+    columns = {
+        'packet_number': np.array(packet_numbers, dtype=np.int64),
+        'offset': np.array(offsets, dtype=np.int64),
+        'end': np.array(ends, dtype=np.int64),
+    }
+    table = np.array(rows, dtype=np.float64).reshape(len(rows), len(keys))
+    for i, key in enumerate(keys):
+        columns[key] = table[:, i]
+    return columns
+
+
+def decode_columns(decoder, data, keys=None, state=None):
+    """
+    Decode MISB0601 fields of every packet into columns keyed by MISB0601 key.
+
+    Fields whose decoded values are all numbers become float64 arrays with NaN for
+    missing values; any other field (strings, enumerations decoded to names, nested
+    local sets) becomes an object array with None for missing values.
+
+    :param decoder: The Decoder used to find and validate packets.
+    :param data: A bytes or bytearray buffer holding the stream data.
+    :param keys: The MISB0601 keys to decode, or None for every key found except the checksum.
+    :param state: The StreamState of the stream. A new one is used, and data is taken to
+        hold the whole recording, if omitted.
+    :return: A dictionary with 'packet_number', 'offset' and 'end' int64 arrays and an
+        array per decoded key.
+    """
+    complete = state is None
+    if state is None:
+        state = StreamState()
+    wanted = None if keys is None else frozenset(keys)
+    use_lookup_tables = decoder.use_lookup_tables
+
+    packet_numbers = []
+    offsets = []
+    ends = []
+    values = {} if keys is None else {key: [] for key in keys}
+    for packetNum, groupStartIndex, endIndex, items in decoder.iter_packets(data, state, complete):
+        row = len(packet_numbers)
+        for item in items:
+            key = item['key']
+            if key == 1 or (wanted is not None and key not in wanted):
+                continue
+            column = values.get(key)
+            if column is None:
+                column = values[key] = []
+            # Pad fields missing from earlier packets; a repeated key keeps its last value
+            column.extend([None] * (row - len(column)))
+            value = decode_misb0601_item(key, item['value'], use_lookup_tables)
+            if len(column) > row:
+                column[row] = value
+            else:
+                column.append(value)
+        packet_numbers.append(packetNum)
+        offsets.append(state.base_offset + groupStartIndex)
+        ends.append(state.base_offset + endIndex)
+
+    count = len(packet_numbers)
+    columns = {
+        'packet_number': np.array(packet_numbers, dtype=np.int64),
+        'offset': np.array(offsets, dtype=np.int64),
+        'end': np.array(ends, dtype=np.int64),
+    }
+    for key, column in values.items():
+        column.extend([None] * (count - len(column)))
+        if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in column):
+            columns[key] = np.array([float('NaN') if value is None else value for value in column], dtype=np.float64)
+        else:
+            array = np.empty(count, dtype=object)
+            array[:] = column
+            columns[key] = array
+    return columns
@@ -0,0 +1,130 @@
+import math
+
+from decoder import StreamState, read_precision_time_stamp
+from misb0601_decoder import misb0601_angle_keys, misb0601_key_names
+
+DECIMATION_STRATEGIES = ('first', 'last', 'mean')
+
+# Descriptive names of the fields averaged on the circle by the 'mean' strategy
+_ANGLE_NAMES = frozenset(misb0601_key_names[key] for key in misb0601_angle_keys)
+
+
+def decode_decimated(decoder, data, interval, strategy='first', state=None, complete=None):
+    """
+    Decode a time-decimated subset of the MISB0601 packets in data.
+
+    Time is split into consecutive windows of `interval` seconds, aligned on multiples of
+    the interval. Only the Precision Time Stamp of each packet is read to place it in a
+    window, by skipping items until key 2 is found. Depending on the strategy:
+    - 'first' decodes the first valid packet of each window and skips the rest of the
+      window without tokenizing it.
+    - 'last' decodes only the last valid packet of each window, once the next window
+      starts. Earlier packets of the window are only tokenized if later ones fail their
+      checksum.
+    - 'mean' decodes every packet of the window and emits the mean of numeric fields
+      (circular mean for headings and azimuths), ignoring NaN values, and the first value
+      of other fields.
+    Packets without a Precision Time Stamp are skipped. The last window is emitted when
+    the end of data is reached.
+
+    :param decoder: The Decoder used to find, validate and decode packets.
+    :param data: A bytes or bytearray buffer holding the stream data.
+    :param interval: The window length in seconds.
+    :param strategy: One of DECIMATION_STRATEGIES.
+    :param state: The StreamState of the stream. A new one is used if omitted.
+    :param complete: Whether data holds the whole recording, see Decoder.iter_packet_bounds.
+    :return: A generator of (packet number, decoded packet) tuples. Packet numbers count
+        only the packets that were validated, as skipped packets are never tokenized. For
+        'mean' the packet number is that of the first packet of the window.
+    """
+    if strategy not in DECIMATION_STRATEGIES:
+        raise ValueError(f"Unknown decimation strategy {strategy!r}, expected one of {DECIMATION_STRATEGIES}")
+    if complete is None:
+        complete = state is None
+    if state is None:
+        state = StreamState()
+    interval_us = max(1, int(round(interval * 1e6)))
+
+    current_window = None
+    window_bounds = []
+    window_packets = []
+    for bounds in decoder.iter_packet_bounds(data, state, complete):
+        time_stamp = read_precision_time_stamp(data, bounds[1], bounds[2])
+        if time_stamp is None:
+            continue
+        window = time_stamp // interval_us
+
+        if strategy == 'first':
+            if window == current_window:
+                continue
+            packet = decoder.read_packet(data, *bounds, state)
+            if packet is not None:
+                current_window = window
+                yield packet[0], decoder.decode_packet(packet[1])
+
+        elif strategy == 'last':
+            if window != current_window and window_bounds:
+                packet = _read_last_valid(decoder, data, window_bounds, state)
+                if packet is not None:
+                    yield packet[0], decoder.decode_packet(packet[1])
+                window_bounds = []
+            current_window = window
+            window_bounds.append(bounds)
+
+        else:
+            if window != current_window and window_packets:
+                yield window_packets[0][0], _mean_packet([packet for packetNum, packet in window_packets])
+                window_packets = []
+            current_window = window
+            packet = decoder.read_packet(data, *bounds, state)
+            if packet is not None:
+                window_packets.append((packet[0], decoder.decode_packet(packet[1])))
+
+    # Emit the last window
+    if strategy == 'last' and window_bounds:
+        packet = _read_last_valid(decoder, data, window_bounds, state)
+        if packet is not None:
+            yield packet[0], decoder.decode_packet(packet[1])
+    elif strategy == 'mean' and window_packets:
+        yield window_packets[0][0], _mean_packet([packet for packetNum, packet in window_packets])
+
+
+def _read_last_valid(decoder, data, window_bounds, state):
+    """
+    Tokenize the packets of a window from the last one back until one passes its checksum.
+
+    :return: A tuple (packet number, parsed items), or None if no packet of the window is valid.
+    """
+    for bounds in reversed(window_bounds):
+        packet = decoder.read_packet(data, *bounds, state)
+        if packet is not None:
+            return packet
+    return None
+
+
+def _mean_packet(packets):
+    """
+    Aggregate the decoded packets of one window.
+
+    :param packets: A list of decoded packets.
+    :return: A decoded packet holding the mean of numeric fields, NaN values aside, and the
+        first value of other fields.
+    """
+    values = {}
+    for packet in packets:
+        for name, value in packet.items():
+            values.setdefault(name, []).append(value)
+
+    result = {}
+    for name, field_values in values.items():
+        numeric = [value for value in field_values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+        numbers = [value for value in numeric if not math.isnan(value)]
+        if len(numeric) != len(field_values) or not numbers:
+            result[name] = field_values[0]
+        elif name in _ANGLE_NAMES:
+            sin_sum = sum(math.sin(math.radians(value)) for value in numbers)
+            cos_sum = sum(math.cos(math.radians(value)) for value in numbers)
+            result[name] = math.degrees(math.atan2(sin_sum, cos_sum)) % 360
+        else:
+            result[name] = sum(numbers) / len(numbers)
+    return result
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bumped whenever the decoded output or the stored layout changes
+CACHE_FORMAT_VERSION = 2
+
+
+class DecodeCache:
+    """
+    A persistent on-disk cache of decoded recordings.
+
+    Entries are keyed either on a BLAKE2 hash of the raw input or, for files, on the path,
+    size and modification time, combined with the parser options. Each entry stores the
+    decoded packets in columnar form (one list per field) as a pickle file. Reading an entry
+    refreshes its modification time, and the least recently used entries are evicted once
+    the cache grows past its size or entry limits.
+    """
+
+    def __init__(self, directory, max_bytes=1 << 30, max_entries=None):
+        """
+        Initialize the DecodeCache.
+
+        :param directory: The directory holding cache entries. It is created if missing.
+        :param max_bytes: The most bytes the entries may take on disk.
+        :param max_entries: The most entries kept, or None for no limit.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for_data(self, rawBinary, options):
+        """
+        Build a cache key from the content of the input.
+
+        :param rawBinary: The raw binary data being decoded.
+        :param options: A tuple of the parser options that affect the output.
+        :return: A hex digest usable as a cache key.
+        """
+        digest = hashlib.blake2b(rawBinary, digest_size=20)
+        digest.update(repr((CACHE_FORMAT_VERSION, options)).encode())
+        return digest.hexdigest()
+
+    def key_for_file(self, path, options):
+        """
+        Build a cache key from the path, size and modification time of a file, without reading it.
+
+        :param path: The path of the recording.
+        :param options: A tuple of the parser options that affect the output.
+        :return: A hex digest usable as a cache key.
+        """
+        stat = os.stat(path)
+        identity = (CACHE_FORMAT_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, options)
+        return hashlib.blake2b(repr(identity).encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """
+        Load the decoded packets stored under a key.
+
+        :param key: A key from key_for_data or key_for_file.
+        :return: A dictionary of decoded packets keyed by packet number, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return columns_to_packets(stored)
+
+    def put(self, key, packets):
+        """
+        Store decoded packets under a key, then evict old entries if over the limits.
+
+        :param key: A key from key_for_data or key_for_file.
+        :param packets: A dictionary of decoded packets keyed by packet number.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(packets_to_columns(packets), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is within its limits.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+
+        total = sum(size for mtime, size, name in entries)
+        count = len(entries)
+        for mtime, size, name in entries:
+            if total <= self.max_bytes and (self.max_entries is None or count <= self.max_entries):
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+
+    def clear(self):
+        """Remove every entry."""
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.unlink(os.path.join(self.directory, name))
+
+
+def packets_to_columns(packets):
+    """
+    Convert decoded packets to columnar form, with None where a packet lacks a field.
+
+    :param packets: A dictionary of decoded packets keyed by packet number.
+    :return: A dictionary with the 'packets' list of packet numbers and a 'columns' dictionary of value lists.
+    """
+    numbers = list(packets)
+    columns = {}
+    for row, packet in enumerate(packets.values()):
+        for name, value in packet.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * len(numbers)
+            column[row] = value
+    return {'packets': numbers, 'columns': columns}
+
+
+def columns_to_packets(stored):
+    """
+    Rebuild decoded packets from the columnar form of packets_to_columns.
+
+    :param stored: The columnar form.
+    :return: A dictionary of decoded packets keyed by packet number.
+    """
+    packets = {packetNum: {} for packetNum in stored['packets']}
+    rows = list(packets.values())
+    for name, column in stored['columns'].items():
+        for packet, value in zip(rows, column):
+            if value is not None:
+                packet[name] = value
+    return packets
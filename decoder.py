@@ -0,0 +1,392 @@
+import threading
+
+from ber import read_ber_length
+from misb0601_decoder import decode_misb0601_item, misb0601_key_names
+from packet_template import PacketTemplate
+
+
+def read_precision_time_stamp(data, valueStartIndex, endIndex):
+    """
+    Read the raw Precision Time Stamp (key 2) of a packet without tokenizing the rest of it.
+
+    Items are skipped by their BER lengths until key 2 is found; encoders put it first.
+
+    :param data: The buffer holding the packet.
+    :param valueStartIndex: The offset of the first item of the packet value.
+    :param endIndex: The offset just past the end of the packet.
+    :return: The time stamp in microseconds, or None if the packet has none.
+    """
+    while valueStartIndex < endIndex:
+        ber = read_ber_length(data, valueStartIndex + 1, endIndex)
+        if ber is None:
+            return None
+        length, length_of_length_field = ber
+        valueIndex = valueStartIndex + 1 + length_of_length_field
+        if data[valueStartIndex] == 2:
+            return int.from_bytes(data[valueIndex:valueIndex + length], byteorder='big')
+        valueStartIndex = valueIndex + length
+    return None
+
+
+def calculate_checksum(packet_data):
+    """
+    Calculate the MISB0601 16-bit checksum of a packet, excluding the checksum value itself.
+
+    :param packet_data: The raw packet data excluding the checksum field itself.
+    :return: The calculated 16-bit checksum as an integer.
+    """
+    # Even-indexed bytes are the high byte of each 16-bit word, odd-indexed bytes the low byte
+    checksum = (sum(packet_data[0::2]) << 8) + sum(packet_data[1::2])
+    return checksum & 0xFFFF
+
+
+class StreamState:
+    """
+    Lightweight per-stream state used by a Decoder.
+
+    A Decoder holds nothing that changes while decoding, so all progress through a
+    stream lives here: where to resume scanning, the next packet number, the layout
+    template detected for the stream and a few counters.
+    """
+
+    def __init__(self):
+        # Offset in the current buffer where the next scan starts
+        self.offset = 0
+        # Absolute stream position of the first byte of the current buffer
+        self.base_offset = 0
+        self.packet_number = 1
+        self.template = None
+        self.last_layout = None
+        self.packets = 0
+        self.checksum_failures = 0
+        # Declared packet lengths above this are treated as corrupted, None for no limit
+        self.max_packet_length = None
+        # Keys skipped because the length following them was corrupted
+        self.resyncs = 0
+        # Raw item bytes of the previous packet by key, and packets since the last keyframe, for delta output
+        self.previous_items = None
+        self.packets_since_keyframe = 0
+
+    def compact(self, buffer):
+        """
+        Drop the bytes of a bytearray buffer that have already been consumed.
+
+        :param buffer: The bytearray the state has been decoding from.
+        :return: The number of bytes removed from the front of the buffer.
+        """
+        consumed = self.offset
+        if consumed:
+            del buffer[:consumed]
+            self.base_offset += consumed
+            self.offset = 0
+        return consumed
+
+
+class Decoder:
+    """
+    A stateless, reusable MISB0601 decoder.
+
+    A Decoder is configured once with the UAS LDS Key and decode options and can then
+    decode packets from any number of streams, concurrently from several threads. Per-stream
+    progress is kept in a StreamState passed to each call. Use get_decoder to share one
+    Decoder per configuration across a process.
+    """
+
+    def __init__(self, key, use_lookup_tables=False, use_templates=False):
+        """
+        Initialize the Decoder.
+
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param use_lookup_tables: Decode 1- and 2-byte fixed-point fields through precomputed
+            lookup tables instead of per-value arithmetic.
+        :param use_templates: Detect a recurring packet layout per stream and split matching
+            packets with a precompiled struct unpacker.
+        """
+        self.key = bytes(key)
+        self.keylength = len(self.key)
+        self.use_lookup_tables = use_lookup_tables
+        self.use_templates = use_templates
+
+    def iter_packet_bounds(self, data, state=None, complete=None):
+        """
+        Locate the complete MISB0601 packets available in data without tokenizing them.
+
+        Scanning resumes at state.offset and stops at the first packet that is not complete
+        yet, leaving state.offset on its key so it is picked up again once more data has been
+        appended. state.offset is moved past each packet before it is yielded. A key followed
+        by a length above state.max_packet_length is taken to be corrupted and scanning
+        resynchronizes on the next occurrence of the key.
+
+        When data holds a whole recording, a packet can also be recognized as corrupted by
+        where its declared end lands: past the end of data while another key follows, or off a
+        key while another key starts inside the packet or straddles its end. Such packets are
+        skipped the same way.
+
+        :param data: A bytes or bytearray buffer holding the stream data.
+        :param state: The StreamState of the stream. A new one is used if omitted.
+        :param complete: Whether data holds the whole recording, so no more data will be appended.
+            Defaults to True when no state is given, since scanning cannot resume without one.
+        :return: A generator of (start index, value start index, end index) tuples.
+        """
+        if complete is None:
+            complete = state is None
+        if state is None:
+            state = StreamState()
+        key = self.key
+        data_length = len(data)
+
+        groupStartIndex = data.find(key, state.offset)
+        while groupStartIndex != -1:
+            lengthIndex = groupStartIndex + self.keylength
+            ber = read_ber_length(data, lengthIndex, data_length)
+            if ber is None:
+                state.offset = groupStartIndex
+                return
+            section_length, length_of_length_field = ber
+            if state.max_packet_length is not None and section_length > state.max_packet_length:
+                state.resyncs += 1
+                groupStartIndex = data.find(key, groupStartIndex + 1)
+                continue
+            valueStartIndex = lengthIndex + length_of_length_field
+            endIndex = valueStartIndex + section_length
+            if endIndex > data_length:
+                if not complete:
+                    state.offset = groupStartIndex
+                    return
+                nextStartIndex = data.find(key, groupStartIndex + 1)
+                if nextStartIndex == -1:
+                    # A recording cut off in the middle of its last packet
+                    state.offset = groupStartIndex
+                    return
+                state.resyncs += 1
+                groupStartIndex = nextStartIndex
+                continue
+            if complete and endIndex < data_length and data.find(key, endIndex, endIndex + self.keylength) != endIndex:
+                # A key starting inside the packet, possibly running past its declared end
+                nextStartIndex = data.find(key, groupStartIndex + 1, endIndex + self.keylength - 1)
+                if nextStartIndex != -1:
+                    state.resyncs += 1
+                    groupStartIndex = nextStartIndex
+                    continue
+
+            state.offset = endIndex
+            yield groupStartIndex, valueStartIndex, endIndex
+
+            groupStartIndex = data.find(key, endIndex)
+
+        # Keep the tail that could hold the start of a key split across appends
+        state.offset = max(state.offset, data_length - self.keylength + 1, 0)
+
+    def iter_packets(self, data, state=None, complete=None):
+        """
+        Find, tokenize and validate the complete MISB0601 packets available in data.
+
+        See iter_packet_bounds for how scanning resumes across appended data and
+        resynchronizes after corrupted lengths.
+
+        :param data: A bytes or bytearray buffer holding the stream data.
+        :param state: The StreamState of the stream. A new one is used if omitted.
+        :param complete: Whether data holds the whole recording, see iter_packet_bounds.
+        :return: A generator of (packet number, start index, end index, parsed items) tuples.
+        """
+        if complete is None:
+            complete = state is None
+        if state is None:
+            state = StreamState()
+
+        for groupStartIndex, valueStartIndex, endIndex in self.iter_packet_bounds(data, state, complete):
+            packet = self.read_packet(data, groupStartIndex, valueStartIndex, endIndex, state)
+            if packet is not None:
+                yield packet[0], groupStartIndex, endIndex, packet[1]
+
+    def read_packet(self, data, groupStartIndex, valueStartIndex, endIndex, state):
+        """
+        Tokenize and validate one located packet, numbering it if its checksum is valid.
+
+        :param data: The buffer holding the packet.
+        :param groupStartIndex: The offset of the packet's UAS LDS Key.
+        :param valueStartIndex: The offset of the first item of the packet value.
+        :param endIndex: The offset just past the end of the packet.
+        :param state: The StreamState of the stream.
+        :return: A tuple (packet number, parsed items), or None if the checksum does not match.
+        """
+        items = self.split_packet(data, valueStartIndex, endIndex, state)
+
+        if not self.validate_checksum(state.packet_number, items, data[groupStartIndex:endIndex]):
+            state.checksum_failures += 1
+            return None
+
+        state.packets += 1
+        packetNum = state.packet_number
+        state.packet_number += 1
+        return packetNum, items
+
+    def decode_iter(self, data, state=None, complete=None):
+        """
+        Decode the complete MISB0601 packets available in data one at a time.
+
+        :param data: A bytes or bytearray buffer holding the stream data.
+        :param state: The StreamState of the stream. A new one is used if omitted.
+        :param complete: Whether data holds the whole recording, see iter_packet_bounds.
+        :return: A generator of (packet number, decoded packet) tuples.
+        """
+        for packetNum, groupStartIndex, endIndex, items in self.iter_packets(data, state, complete):
+            yield packetNum, self.decode_packet(items)
+
+    def decode_deltas(self, data, state=None, keyframe_interval=30, complete=None):
+        """
+        Decode only the fields that changed since the previous packet of the stream.
+
+        Each item's raw bytes are compared with the same key's bytes in the previous packet
+        before anything is decoded, so unchanged fields cost a byte comparison and are not
+        emitted. Fields that disappeared are emitted as None. Every `keyframe_interval`
+        packets, and for the first packet of a stream, all fields are emitted.
+
+        :param data: A bytes or bytearray buffer holding the stream data.
+        :param state: The StreamState of the stream. A new one is used if omitted.
+        :param keyframe_interval: The number of packets between full keyframes.
+        :param complete: Whether data holds the whole recording, see iter_packet_bounds.
+        :return: A generator of (packet number, decoded changed fields, is keyframe) tuples.
+        """
+        if complete is None:
+            complete = state is None
+        if state is None:
+            state = StreamState()
+
+        for packetNum, groupStartIndex, endIndex, items in self.iter_packets(data, state, complete):
+            current = {item['key']: item['raw_item_bytes'] for item in items if item['key'] != 1}
+            previous = state.previous_items
+            state.previous_items = current
+
+            if previous is None or state.packets_since_keyframe + 1 >= keyframe_interval:
+                state.packets_since_keyframe = 0
+                yield packetNum, self.decode_packet(items), True
+                continue
+
+            state.packets_since_keyframe += 1
+            changed = [item for item in items if item['key'] != 1 and previous.get(item['key']) != item['raw_item_bytes']]
+            packet = self.decode_packet(changed)
+            for key in previous.keys() - current.keys():
+                packet[misb0601_key_names.get(key, f"Unknown Key {key}")] = None
+            yield packetNum, packet, False
+
+    def split_packet(self, data, valueStartIndex, endIndex, state):
+        """
+        Split a packet value into its items, using the stream's layout template if it matches.
+
+        :param data: The buffer holding the packet.
+        :param valueStartIndex: The offset of the first item of the packet value.
+        :param endIndex: The offset just past the end of the packet.
+        :param state: The StreamState of the stream.
+        :return: A list of parsed items.
+        """
+        items = None
+        if state.template is not None:
+            items = state.template.unpack(data, valueStartIndex, endIndex - valueStartIndex)
+
+        if items is None:
+            items = self.tokenize_packet(data, valueStartIndex, endIndex)
+            if self.use_templates:
+                # Compile a template once the same layout is seen in two consecutive packets
+                layout = PacketTemplate.from_items(items)
+                state.template = layout if layout == state.last_layout else None
+                state.last_layout = layout
+
+        return items
+
+    def tokenize_packet(self, data, valueStartIndex, endIndex):
+        """
+        Split a packet value into its KLV items by walking the BER length of each item.
+
+        :param data: The buffer holding the packet.
+        :param valueStartIndex: The offset of the first item of the packet value.
+        :param endIndex: The offset just past the end of the packet.
+        :return: A list of parsed items.
+        """
+        items = []
+
+        # Parse each KLV item within the packet
+        while valueStartIndex < endIndex:
+            ber = read_ber_length(data, valueStartIndex + 1, endIndex)
+            if ber is None:
+                break
+            length, length_of_length_field = ber
+            valueIndex = valueStartIndex + 1 + length_of_length_field
+            items.append({
+                'key': data[valueStartIndex],
+                'length': length,
+                'value': bytes(data[valueIndex:valueIndex + length]),
+                'raw_item_bytes': bytes(data[valueStartIndex:valueIndex + length])
+            })
+            valueStartIndex = valueIndex + length
+
+        return items
+
+    def validate_checksum(self, packetNum, items, raw_packet_data):
+        """
+        Validate a packet against its checksum item, if present.
+
+        :param packetNum: The packet number, used when reporting a mismatch.
+        :param items: The parsed items of the packet.
+        :param raw_packet_data: The raw packet bytes, from the UAS LDS Key to the end of the checksum.
+        :return: False if the packet has a checksum item that does not match, True otherwise.
+        """
+        provided_checksum = None
+        for item in items:
+            if item['key'] == 1:  # Checksum key
+                provided_checksum = int.from_bytes(item['value'], byteorder='big')
+
+        if provided_checksum is not None:
+            calculated_checksum = calculate_checksum(raw_packet_data[:-2])  # Exclude the checksum field
+            if calculated_checksum != provided_checksum:
+                print(f"Packet {packetNum} checksum mismatch: {calculated_checksum} != {provided_checksum}")
+                return False
+
+        return True
+
+    def decode_packet(self, items):
+        """
+        Decode the parsed items of a single packet.
+
+        :param items: A list of parsed items for one packet.
+        :return: A dictionary of decoded values keyed by descriptive field name.
+        """
+        packet = {}
+
+        # Decode each item in the packet; nested sets such as the Security (48) and VMTI (74)
+        # Local Sets go through decode_misb0601_item too, so they are profiled like other tags
+        for item in items:
+            key = item['key']
+            value = item['value']
+
+            # Excluding the checksum key
+            if key != 1:
+                decoded_value = decode_misb0601_item(key, value, self.use_lookup_tables)
+                descriptive_key = misb0601_key_names.get(key, f"Unknown Key {key}")
+                packet[descriptive_key] = decoded_value
+
+        return packet
+
+
+# Decoders shared across the process, keyed by configuration
+_decoders = {}
+_decoders_lock = threading.Lock()
+
+def get_decoder(key, use_lookup_tables=False, use_templates=False):
+    """
+    Return the process-wide Decoder for a configuration, creating it on first use.
+
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param use_lookup_tables: See Decoder.
+    :param use_templates: See Decoder.
+    :return: A shared Decoder instance.
+    """
+    config = (bytes(key), use_lookup_tables, use_templates)
+    decoder = _decoders.get(config)
+    if decoder is None:
+        with _decoders_lock:
+            decoder = _decoders.get(config)
+            if decoder is None:
+                decoder = Decoder(*config)
+                _decoders[config] = decoder
+    return decoder
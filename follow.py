@@ -0,0 +1,144 @@
+import os
+import time
+
+from decoder import StreamState, get_decoder
+
+# Far above any real MISB0601 packet, including large nested VMTI sets
+DEFAULT_MAX_PACKET_LENGTH = 1 << 20
+
+
+class FileFollower:
+    """
+    Decodes a recording that is still being written, like `tail -f`.
+
+    Only bytes appended since the previous poll are read, one read_size chunk at a time. Each
+    chunk is decoded as soon as it is read and only the incomplete packet at its end is kept,
+    so nothing before it is scanned again. The absolute offset just past the last complete
+    packet is kept in last_packet_end and can be passed back as start_offset to resume later.
+    """
+
+    def __init__(self, path, key, start_offset=0, poll_interval=0.2, read_size=1 << 20,
+                 use_lookup_tables=False, use_templates=True, max_poll_bytes=16 << 20,
+                 max_packet_length=DEFAULT_MAX_PACKET_LENGTH):
+        """
+        Initialize the FileFollower.
+
+        :param path: The path of the growing recording.
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param start_offset: The file offset to start decoding from.
+        :param poll_interval: The seconds to wait between polls when no new data arrived.
+        :param read_size: The most bytes read from the file per read call.
+        :param use_lookup_tables: See Decoder.
+        :param use_templates: See Decoder.
+        :param max_poll_bytes: The most bytes read per poll, bounding the packets one poll returns
+            while catching up on a large file.
+        :param max_packet_length: Declared packet lengths above this are treated as corrupted and
+            skipped, so one bad length cannot stall the follower while it buffers everything
+            appended after it. None disables the check.
+        """
+        self.path = path
+        self.decoder = get_decoder(key, use_lookup_tables, use_templates)
+        self.poll_interval = poll_interval
+        self.read_size = read_size
+        self.max_poll_bytes = max_poll_bytes
+        self.max_packet_length = max_packet_length
+        # Whether the last poll read up to the end of the file
+        self.at_end = False
+        self.file = open(path, 'rb')
+        self._reset(start_offset)
+
+    def _reset(self, offset):
+        self.file.seek(offset)
+        self.buffer = bytearray()
+        self.state = StreamState()
+        self.state.base_offset = offset
+        self.state.max_packet_length = self.max_packet_length
+        self.last_packet_end = offset
+
+    def close(self):
+        """Close the followed file."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def poll(self):
+        """
+        Read the bytes appended since the last poll and decode the complete packets among them.
+
+        At most max_poll_bytes are read; at_end tells whether the poll reached the end of the file.
+
+        If the file became shorter than the position already read, it is assumed to have been
+        truncated and is followed again from its start. If the path now names another file,
+        e.g. after a rename by log rotation, the rest of the old file is read first and then
+        the new file is followed from its start.
+
+        :return: A list of (packet number, decoded packet) tuples.
+        """
+        position = self.state.base_offset + len(self.buffer)
+        if os.fstat(self.file.fileno()).st_size < position:
+            self._reopen()
+
+        decoded = self._read_available()
+        if self.at_end and self._replaced():
+            self._reopen()
+            decoded += self._read_available()
+        return decoded
+
+    def _replaced(self):
+        """Whether the path names a different file than the one open."""
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            # Renamed away and not recreated yet
+            return False
+        opened = os.fstat(self.file.fileno())
+        return (current.st_ino, current.st_dev) != (opened.st_ino, opened.st_dev)
+
+    def _reopen(self):
+        self.file.close()
+        self.file = open(self.path, 'rb')
+        self._reset(0)
+
+    def _read_available(self):
+        decoded = []
+        decoder = self.decoder
+        state = self.state
+        buffer = self.buffer
+        read_bytes = 0
+        self.at_end = False
+        while read_bytes < self.max_poll_bytes:
+            data = self.file.read(self.read_size)
+            if not data:
+                self.at_end = True
+                break
+            read_bytes += len(data)
+            buffer += data
+            for packetNum, groupStartIndex, endIndex, items in decoder.iter_packets(buffer, state):
+                decoded.append((packetNum, decoder.decode_packet(items)))
+                self.last_packet_end = state.base_offset + endIndex
+            state.compact(buffer)
+        return decoded
+
+    def follow(self, idle_timeout=None, stop_event=None):
+        """
+        Poll the file continuously, yielding packets as they are completed.
+
+        :param idle_timeout: Stop after this many seconds without a new packet, or None to follow forever.
+        :param stop_event: An optional threading.Event that stops following when set.
+        :return: A generator of (packet number, decoded packet) tuples.
+        """
+        last_packet = time.monotonic()
+        while stop_event is None or not stop_event.is_set():
+            packets = self.poll()
+            if packets:
+                last_packet = time.monotonic()
+                yield from packets
+            if packets or not self.at_end:
+                continue
+            if idle_timeout is not None and time.monotonic() - last_packet >= idle_timeout:
+                return
+            time.sleep(self.poll_interval)
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Frame Center Latitude/Longitude
+FRAME_CENTER_KEYS = (23, 24)
+# Offset Corner Latitude/Longitude Points 1-4, relative to the frame center
+OFFSET_CORNER_KEYS = ((26, 27), (28, 29), (30, 31), (32, 33))
+# Offset Corner Latitude/Longitude Points 1-4 (Full), absolute coordinates
+FULL_CORNER_KEYS = ((82, 83), (84, 85), (86, 87), (88, 89))
+
+FOOTPRINT_KEYS = FRAME_CENTER_KEYS + tuple(
+    key for pair in OFFSET_CORNER_KEYS + FULL_CORNER_KEYS for key in pair
+)
+
+
+def compute_footprints(columns):
+    """
+    Compute the ground footprint quadrilateral of every packet, vectorized across packets.
+
+    Corners come from the full corner fields (82-89) where present, otherwise from the
+    frame center plus the offset corner fields (26-33). Packets without any corner fields
+    get a degenerate footprint at the frame center; packets without a frame center get NaN.
+
+    :param columns: A dictionary of float arrays keyed by MISB0601 key, holding at least
+        FOOTPRINT_KEYS, as returned by columns.read_columns.
+    :return: A tuple (latitudes, longitudes) of (N, 4) arrays of corner coordinates.
+    """
+    center_lat = columns[FRAME_CENTER_KEYS[0]][:, np.newaxis]
+    center_lon = columns[FRAME_CENTER_KEYS[1]][:, np.newaxis]
+
+    offset_lat = np.column_stack([columns[lat] for lat, lon in OFFSET_CORNER_KEYS])
+    offset_lon = np.column_stack([columns[lon] for lat, lon in OFFSET_CORNER_KEYS])
+    full_lat = np.column_stack([columns[lat] for lat, lon in FULL_CORNER_KEYS])
+    full_lon = np.column_stack([columns[lon] for lat, lon in FULL_CORNER_KEYS])
+
+    latitudes = center_lat + np.nan_to_num(offset_lat)
+    longitudes = center_lon + np.nan_to_num(offset_lon)
+
+    has_full = ~(np.isnan(full_lat) | np.isnan(full_lon))
+    latitudes = np.where(has_full, full_lat, latitudes)
+    longitudes = np.where(has_full, full_lon, longitudes)
+    return latitudes, longitudes
+
+
+def footprint_bounds(latitudes, longitudes):
+    """
+    Compute the bounding box of each footprint.
+
+    :param latitudes: An (N, 4) array of corner latitudes.
+    :param longitudes: An (N, 4) array of corner longitudes.
+    :return: An (N, 4) array of (min latitude, min longitude, max latitude, max longitude).
+    """
+    return np.column_stack([
+        latitudes.min(axis=1),
+        longitudes.min(axis=1),
+        latitudes.max(axis=1),
+        longitudes.max(axis=1),
+    ])
+
+
+def points_in_footprints(latitudes, longitudes, lat, lon):
+    """
+    Test whether a point lies inside each footprint quadrilateral, by ray casting over its four edges.
+
+    :param latitudes: An (N, 4) array of corner latitudes.
+    :param longitudes: An (N, 4) array of corner longitudes.
+    :param lat: The latitude of the point.
+    :param lon: The longitude of the point.
+    :return: A boolean array of length N.
+    """
+    next_lat = np.roll(latitudes, -1, axis=1)
+    next_lon = np.roll(longitudes, -1, axis=1)
+    crosses = (latitudes > lat) != (next_lat > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        edge_lon = longitudes + (lat - latitudes) * (next_lon - longitudes) / (next_lat - latitudes)
+    inside = np.logical_and(crosses, lon < edge_lon).sum(axis=1) % 2 == 1
+
+    # A degenerate footprint contains only its own point
+    degenerate = (latitudes.min(axis=1) == latitudes.max(axis=1)) & (longitudes.min(axis=1) == longitudes.max(axis=1))
+    on_point = (latitudes[:, 0] == lat) & (longitudes[:, 0] == lon)
+    return np.where(degenerate, on_point, inside)
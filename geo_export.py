@@ -0,0 +1,368 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from columns import read_columns
+from decoder import StreamState, get_decoder
+from footprint import FOOTPRINT_KEYS, compute_footprints
+
+# Sensor Latitude/Longitude/True Altitude
+TRACK_KEYS = (13, 14, 15)
+EXPORT_KEYS = (2,) + TRACK_KEYS + FOOTPRINT_KEYS
+
+EARTH_RADIUS = 6371008.8
+
+
+def simplify_track(latitudes, longitudes, tolerance):
+    """
+    Select the points of a track kept by Douglas-Peucker simplification.
+
+    Points are projected to meters on a plane tangent at the mean latitude of the track.
+    The farthest point of each segment is found with one vectorized distance computation
+    over the segment, and segments are split until every dropped point lies within the
+    tolerance of the simplified line.
+
+    :param latitudes: An array of latitudes in degrees.
+    :param longitudes: An array of longitudes in degrees.
+    :param tolerance: The largest distance in meters between a dropped point and the simplified track.
+    :return: A boolean array, True for the points to keep.
+    """
+    count = len(latitudes)
+    keep = np.zeros(count, dtype=bool)
+    if count == 0:
+        return keep
+    keep[0] = keep[-1] = True
+
+    y = np.radians(latitudes) * EARTH_RADIUS
+    x = np.radians(longitudes) * EARTH_RADIUS * np.cos(np.radians(np.mean(latitudes)))
+
+    segments = [(0, count - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        dx = x[last] - x[first]
+        dy = y[last] - y[first]
+        px = x[first + 1:last] - x[first]
+        py = y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            segments.append((first, index))
+            segments.append((index, last))
+    return keep
+
+
+def _first_of_windows(time_stamps, interval_ms, previous_window):
+    """
+    Select the first packet of each time window, continuing the windows of the previous batch.
+
+    :return: A tuple (boolean mask, window of the last selected packet).
+    """
+    with np.errstate(invalid='ignore'):
+        windows = np.floor(time_stamps / interval_ms)
+    valid = ~np.isnan(windows)
+    windows = windows[valid]
+    first = np.empty(len(windows), dtype=bool)
+    if len(windows):
+        first[0] = windows[0] != previous_window
+        first[1:] = windows[1:] != windows[:-1]
+        previous_window = windows[-1]
+    keep = np.zeros(len(time_stamps), dtype=bool)
+    keep[valid] = first
+    return keep, previous_window
+
+
+def _iso_time(time_stamp):
+    """Format a Precision Time Stamp (milliseconds since the epoch) as an ISO 8601 string."""
+    if np.isnan(time_stamp):
+        return None
+    return datetime.fromtimestamp(time_stamp / 1000.0, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class GeoExporter(ABC):
+    """
+    Streams the flight track and image footprints of decoded packets to a GIS file.
+
+    Packets are passed in batches of columns (see columns.read_columns) and all coordinate
+    math runs on whole batches. The track is written as consecutive LineString segments of
+    at most `max_track_points` points, each starting where the previous one ended, so memory
+    stays bounded on long flights. Each footprint is written as a Polygon as soon as its batch
+    is processed. Subclasses write the GeoJSON or KML syntax.
+    """
+
+    def __init__(self, file, track=True, footprints=True, track_interval=None, footprint_interval=None,
+                 simplify_tolerance=None, max_track_points=10000):
+        """
+        Initialize the GeoExporter and write the start of the document.
+
+        :param file: A text file object the document is written to.
+        :param track: Whether to write the sensor track.
+        :param footprints: Whether to write the image footprints.
+        :param track_interval: Keep at most one track point per this many seconds, or None for all.
+        :param footprint_interval: Keep at most one footprint per this many seconds, or None for all.
+        :param simplify_tolerance: Douglas-Peucker tolerance in meters applied to the track of
+            each batch, or None to disable simplification.
+        :param max_track_points: The most points in one track segment.
+        """
+        self.file = file
+        self.track = track
+        self.footprints = footprints
+        self.track_interval = track_interval
+        self.footprint_interval = footprint_interval
+        self.simplify_tolerance = simplify_tolerance
+        self.max_track_points = max_track_points
+
+        self._track_window = None
+        self._footprint_window = None
+        # Pending track points, as an (N, 3) array of longitude, latitude, altitude, with their times and packet numbers
+        self._points = np.empty((0, 3))
+        self._times = np.empty(0)
+        self._packets = np.empty(0, dtype=np.int64)
+        self.track_segments = 0
+        self.footprints_written = 0
+        self.write_header()
+
+    def write_columns(self, columns):
+        """
+        Add a batch of packets.
+
+        :param columns: A dictionary of arrays holding at least EXPORT_KEYS and 'packet_number',
+            as returned by columns.read_columns.
+        """
+        time_stamps = columns[2]
+        if self.track:
+            self._add_track(columns, time_stamps)
+        if self.footprints:
+            self._add_footprints(columns, time_stamps)
+
+    def _add_track(self, columns, time_stamps):
+        latitudes = columns[TRACK_KEYS[0]]
+        longitudes = columns[TRACK_KEYS[1]]
+        keep = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        if self.track_interval is not None:
+            windows, self._track_window = _first_of_windows(
+                np.where(keep, time_stamps, np.nan), self.track_interval * 1e3, self._track_window)
+            keep &= windows
+        if not keep.any():
+            return
+
+        latitudes = latitudes[keep]
+        longitudes = longitudes[keep]
+        # Points without an altitude are placed on the ellipsoid
+        altitudes = np.nan_to_num(columns[TRACK_KEYS[2]][keep])
+        times = time_stamps[keep]
+        packets = columns['packet_number'][keep]
+        if self.simplify_tolerance is not None:
+            simplified = simplify_track(latitudes, longitudes, self.simplify_tolerance)
+            latitudes, longitudes, altitudes = latitudes[simplified], longitudes[simplified], altitudes[simplified]
+            times, packets = times[simplified], packets[simplified]
+
+        self._points = np.concatenate((self._points, np.column_stack((longitudes, latitudes, altitudes))))
+        self._times = np.concatenate((self._times, times))
+        self._packets = np.concatenate((self._packets, packets))
+        while len(self._points) >= self.max_track_points:
+            self._flush_track(self.max_track_points)
+
+    def _flush_track(self, count):
+        """
+        Write the first `count` pending track points as a segment, keeping the last one to start the next.
+        """
+        if count < 2:
+            return
+        self.write_track_segment(self._points[:count], self._times[[0, count - 1]], self._packets[[0, count - 1]])
+        self.track_segments += 1
+        self._points = self._points[count - 1:]
+        self._times = self._times[count - 1:]
+        self._packets = self._packets[count - 1:]
+
+    def _add_footprints(self, columns, time_stamps):
+        latitudes, longitudes = compute_footprints(columns)
+        keep = ~(np.isnan(latitudes).any(axis=1) | np.isnan(longitudes).any(axis=1))
+        # Packets without corner fields only give a point at the frame center
+        keep &= (latitudes.min(axis=1) != latitudes.max(axis=1)) | (longitudes.min(axis=1) != longitudes.max(axis=1))
+        if self.footprint_interval is not None:
+            windows, self._footprint_window = _first_of_windows(
+                np.where(keep, time_stamps, np.nan), self.footprint_interval * 1e3, self._footprint_window)
+            keep &= windows
+        if not keep.any():
+            return
+
+        # Closed rings of (longitude, latitude), shaped (N, 5, 2)
+        rings = np.stack((longitudes[keep], latitudes[keep]), axis=-1)
+        rings = np.concatenate((rings, rings[:, :1]), axis=1)
+        self.write_footprints(rings, time_stamps[keep], columns['packet_number'][keep])
+        self.footprints_written += len(rings)
+
+    def close(self):
+        """Write the remaining track points and the end of the document."""
+        self._flush_track(len(self._points))
+        self.write_footer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @abstractmethod
+    def write_header(self):
+        """Write the start of the document."""
+
+    @abstractmethod
+    def write_track_segment(self, points, times, packets):
+        """
+        Write one piece of the track.
+
+        :param points: An (N, 3) array of longitude, latitude and altitude.
+        :param times: The time stamps of the first and last point.
+        :param packets: The packet numbers of the first and last point.
+        """
+
+    @abstractmethod
+    def write_footprints(self, rings, times, packets):
+        """
+        Write ground footprints.
+
+        :param rings: An (N, 5, 2) array of closed (longitude, latitude) rings.
+        :param times: The time stamp of each footprint.
+        :param packets: The packet number of each footprint.
+        """
+
+    @abstractmethod
+    def write_footer(self):
+        """Write the end of the document."""
+
+
+class GeoJSONExporter(GeoExporter):
+    """
+    Writes a GeoJSON FeatureCollection of track LineStrings and footprint Polygons.
+    Coordinates are rounded to 7 decimal places (about 1 cm).
+    """
+
+    def write_header(self):
+        self.file.write('{"type": "FeatureCollection", "features": [\n')
+        self._separator = ''
+
+    def _write_feature(self, geometry_type, coordinates, properties):
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': geometry_type, 'coordinates': coordinates},
+            'properties': properties,
+        }
+        self.file.write(self._separator + json.dumps(feature, separators=(',', ':')))
+        self._separator = ',\n'
+
+    def write_track_segment(self, points, times, packets):
+        self._write_feature('LineString', np.round(points, 7).tolist(), {
+            'kind': 'track',
+            'start_time': _iso_time(times[0]),
+            'end_time': _iso_time(times[1]),
+            'first_packet': int(packets[0]),
+            'last_packet': int(packets[1]),
+        })
+
+    def write_footprints(self, rings, times, packets):
+        for ring, time_stamp, packetNum in zip(np.round(rings, 7).tolist(), times, packets):
+            self._write_feature('Polygon', [ring], {
+                'kind': 'footprint',
+                'time': _iso_time(time_stamp),
+                'packet_number': int(packetNum),
+            })
+
+    def write_footer(self):
+        self.file.write('\n]}\n')
+
+
+class KMLExporter(GeoExporter):
+    """
+    Writes a KML document of track LineStrings at absolute altitude and clamped footprint Polygons.
+    """
+
+    def write_header(self):
+        self.file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n'
+            '<Style id="track"><LineStyle><color>ff00ffff</color><width>2</width></LineStyle></Style>\n'
+            '<Style id="footprint"><LineStyle><color>ff0000ff</color></LineStyle>'
+            '<PolyStyle><color>330000ff</color></PolyStyle></Style>\n'
+        )
+
+    def write_track_segment(self, points, times, packets):
+        coordinates = ('%.7f,%.7f,%.1f ' * len(points)) % tuple(points.ravel())
+        span = ''
+        if not np.isnan(times).any():
+            span = f"<TimeSpan><begin>{_iso_time(times[0])}</begin><end>{_iso_time(times[1])}</end></TimeSpan>"
+        self.file.write(
+            f"<Placemark><name>{escape(f'Track packets {packets[0]}-{packets[1]}')}</name>{span}"
+            '<styleUrl>#track</styleUrl><LineString><altitudeMode>absolute</altitudeMode>'
+            f"<coordinates>{coordinates.rstrip()}</coordinates></LineString></Placemark>\n"
+        )
+
+    def write_footprints(self, rings, times, packets):
+        ring_format = '%.7f,%.7f ' * 5
+        flat = rings.reshape(len(rings), 10)
+        lines = []
+        for ring, time_stamp, packetNum in zip(flat.tolist(), times.tolist(), packets.tolist()):
+            when = _iso_time(time_stamp)
+            stamp = f"<TimeStamp><when>{when}</when></TimeStamp>" if when else ''
+            lines.append(
+                f"<Placemark><name>Footprint {packetNum}</name>{stamp}<styleUrl>#footprint</styleUrl>"
+                '<Polygon><outerBoundaryIs><LinearRing>'
+                f"<coordinates>{(ring_format % tuple(ring)).rstrip()}</coordinates>"
+                '</LinearRing></outerBoundaryIs></Polygon></Placemark>\n'
+            )
+        self.file.write(''.join(lines))
+
+    def write_footer(self):
+        self.file.write('</Document>\n</kml>\n')
+
+
+EXPORTERS = {'geojson': GeoJSONExporter, 'kml': KMLExporter}
+
+
+def export_file(path, output_path, key, export_format=None, read_size=1 << 22,
+                use_lookup_tables=False, use_templates=True, **options):
+    """
+    Export the track and footprints of a recording, reading and decoding it in chunks.
+
+    :param path: The path of the recording.
+    :param output_path: The path of the GeoJSON or KML file to write.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param export_format: 'geojson' or 'kml', by default taken from the output file extension.
+    :param read_size: The number of bytes read and decoded per batch.
+    :param use_lookup_tables: See Decoder.
+    :param use_templates: See Decoder.
+    :param options: Passed to the GeoExporter, e.g. footprint_interval or simplify_tolerance.
+    :return: The GeoExporter used, holding the number of segments and footprints written.
+    """
+    if export_format is None:
+        export_format = 'kml' if os.path.splitext(output_path)[1].lower() == '.kml' else 'geojson'
+    if export_format not in EXPORTERS:
+        raise ValueError(f"Unknown export format {export_format!r}, expected one of {tuple(EXPORTERS)}")
+
+    decoder = get_decoder(key, use_lookup_tables, use_templates)
+    state = StreamState()
+    buffer = bytearray()
+    with open(path, 'rb') as source, open(output_path, 'w', encoding='utf-8') as output:
+        with EXPORTERS[export_format](output, **options) as exporter:
+            while True:
+                chunk = source.read(read_size)
+                if not chunk:
+                    break
+                buffer += chunk
+                columns = read_columns(decoder, buffer, EXPORT_KEYS, state)
+                if len(columns['packet_number']):
+                    exporter.write_columns(columns)
+                state.compact(buffer)
+    return exporter
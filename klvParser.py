@@ -1,6 +1,8 @@
-from misb0102 import SecurityMetadataLocalSet
-from misb0903 import VMTIMetadataLocalSet
-from misb0601_decoder import decode_misb0601_item, misb0601_key_names
+import time
+
+from decimation import decode_decimated
+from decoder import StreamState, calculate_checksum, get_decoder
+from packet_callbacks import PacketDispatcher
 
 
 class KLVParser:
@@ -12,54 +14,175 @@ class KLVParser:
     - Handles special cases for Security Local Set (MISB0102) and VMTI Local Set (MISB0903).
     """
 
-    def __init__(self, rawBinary, key):
+    def __init__(self, rawBinary, key, use_lookup_tables=False, use_templates=False, cache=None):
         """
         Initialize the KLVParser.
 
         :param rawBinary: The raw binary data containing one or more KLV packets.
         :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param use_lookup_tables: Decode 1- and 2-byte fixed-point fields through precomputed
+            lookup tables instead of per-value arithmetic.
+        :param use_templates: Detect a recurring packet layout and split matching packets
+            with a precompiled struct unpacker instead of the generic tokenizer.
+        :param cache: An optional DecodeCache. decode() then returns a stored result for
+            input it has already decoded with the same options.
         """
         self.rawBinary = rawBinary
         self.key = key
         self.keylength = len(key)
+        self.use_lookup_tables = use_lookup_tables
+        self.use_templates = use_templates
+        self.decoder = get_decoder(key, use_lookup_tables, use_templates)
+        self.state = StreamState()
+        self.cache = cache
+        self.source_path = None
+        self.dispatcher = PacketDispatcher()
         self.result = {}
 
+    @classmethod
+    def from_file(cls, path, key, use_lookup_tables=False, use_templates=False, cache=None):
+        """
+        Create a KLVParser for a recording on disk.
+
+        With a cache, the cache key is built from the file's path, size and modification
+        time, so a cached decode of an unchanged file does not hash its content.
+
+        :param path: The path of the recording.
+        :return: A KLVParser over the file's content.
+        """
+        with open(path, 'rb') as f:
+            parser = cls(f.read(), key, use_lookup_tables, use_templates, cache)
+        parser.source_path = path
+        return parser
+
     def decode(self):
         """
         Decode all MISB0601 packets found in the raw binary data.
 
         This method:
-        - Constructs packet groups based on the provided UAS LDS Key.
-        - Parses each identified group into individual items.
-        - Validates checksums for each packet.
-        - Decodes MISB0601 fields.
-        - Handles Security and VMTI local sets specially.
+        - Returns the cached result when a cache is set and holds this input, still passing
+          each cached packet to the on_packet subscribers.
+        - Otherwise runs decode_iter over the raw binary data and stores the result in the cache.
         - Stores decoded results in self.result.
         """
-        parsed = self.parseGroups(self.constructGroups())
-        for packetNum, items in parsed.items():
-            self.result[packetNum] = {}
+        cache_key = None
+        if self.cache is not None:
+            options = (bytes(self.key), self.use_templates)
+            if self.source_path is not None:
+                cache_key = self.cache.key_for_file(self.source_path, options)
+            else:
+                cache_key = self.cache.key_for_data(self.rawBinary, options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.result = cached
+                dispatcher = self.dispatcher
+                if dispatcher.subscribers:
+                    for packetNum, packet in cached.items():
+                        dispatcher.dispatch(packetNum, packet, time.perf_counter())
+                return
+
+        for packetNum, packet in self.decode_iter():
+            self.result[packetNum] = packet
+
+        if cache_key is not None:
+            self.cache.put(cache_key, self.result)
+
+    def decode_iter(self):
+        """
+        Decode MISB0601 packets one at a time as they are found in the raw binary data.
+
+        Scanning, tokenizing, checksum validation and decoding are done in a single pass,
+        so no intermediate list of packet groups or parsed items is kept and decoded
+        packets are not accumulated in self.result.
+
+        :return: A generator of (packet number, decoded packet) tuples.
+        """
+        dispatcher = self.dispatcher
+        decoder = self.decoder
+        data = self.rawBinary
+        self.state = state = StreamState()
+        for bounds in decoder.iter_packet_bounds(data, state, complete=True):
+            # A packet arrives once its last byte has been located in the input
+            arrival_time = time.perf_counter() if dispatcher.subscribers else None
+            packet = decoder.read_packet(data, *bounds, state)
+            if packet is None:
+                continue
+            packetNum, items = packet
+            packet = self.decodePacket(items)
+            if dispatcher.subscribers:
+                dispatcher.dispatch(packetNum, packet, arrival_time)
+            yield packetNum, packet
+
+    def on_packet(self, callback, loop=None):
+        """
+        Subscribe a callback(packet_number, packet) fired as soon as each packet is validated
+        and decoded by decode_iter or decode.
+
+        Coroutine functions are scheduled on `loop`, or on the event loop running in the
+        calling thread. The delay from locating each packet in the input to its callback,
+        i.e. the time spent validating, decoding and dispatching it, is recorded in
+        self.latency.
+
+        :param callback: A callable or a coroutine function.
+        :param loop: The event loop to run a coroutine function on.
+        :return: The callback, for use with self.dispatcher.unsubscribe.
+        """
+        return self.dispatcher.subscribe(callback, loop)
+
+    @property
+    def latency(self):
+        """
+        The LatencyHistogram of arrival-to-callback delays. Use latency.summary() for p50/p99/max.
+        """
+        return self.dispatcher.latency
 
-            # Decode each item in the packet
-            for item in items:
-                key = item['key']
-                value = item['value']
+    def decode_deltas(self, keyframe_interval=30):
+        """
+        Decode MISB0601 packets emitting only the fields that changed since the previous packet,
+        with a full keyframe every `keyframe_interval` packets. See Decoder.decode_deltas.
 
-                # Handle Security Local Set
-                if key == 48:
-                    sec_meta = SecurityMetadataLocalSet(value, self.key)
-                    self.result[packetNum]['Security Local Set'] = sec_meta.parse_security_klv(sec_meta.sec_parsed_keys)
+        :param keyframe_interval: The number of packets between full keyframes.
+        :return: A generator of (packet number, decoded changed fields, is keyframe) tuples.
+        """
+        self.state = StreamState()
+        return self.decoder.decode_deltas(self.rawBinary, self.state, keyframe_interval, complete=True)
 
-                # Handle VMTI Local Set
-                elif key == 74:
-                    vmti_meta = VMTIMetadataLocalSet(value, self.key)
-                    self.result[packetNum]['VMTI Local Set'] = vmti_meta.parse_vmti_klv(vmti_meta.vmti_parsed_keys)
+    def decode_decimated(self, interval, strategy='first'):
+        """
+        Decode one packet, or one aggregate, per `interval` seconds of Precision Time Stamp.
+        Packets inside an interval that is already served are not tokenized or decoded.
+        See decimation.decode_decimated.
 
-                # Handle general MISB0601 items (excluding the checksum key)
-                elif key != 1:
-                    decoded_value = decode_misb0601_item(key, value)
-                    descriptive_key = misb0601_key_names.get(key, f"Unknown Key {key}")
-                    self.result[packetNum][descriptive_key] = decoded_value
+        :param interval: The interval length in seconds.
+        :param strategy: 'first', 'last' or 'mean'.
+        :return: A generator of (packet number, decoded packet) tuples.
+        """
+        self.state = StreamState()
+        return decode_decimated(self.decoder, self.rawBinary, interval, strategy, self.state, complete=True)
+
+    def decodePacket(self, items):
+        """
+        Decode the parsed items of a single packet.
+
+        :param items: A list of parsed items for one packet.
+        :return: A dictionary of decoded values keyed by descriptive field name.
+        """
+        return self.decoder.decode_packet(items)
+
+    def iterPackets(self):
+        """
+        Find, tokenize and validate MISB0601 packets in a single pass over the raw binary data.
+
+        Packets are located with bytes.find on the UAS LDS Key and skipped as a whole once
+        parsed. A trailing packet that is cut off by the end of the data is not returned.
+        A packet with a corrupted length is skipped and scanning resumes at the next key.
+        Packets failing their checksum are reported and skipped, and do not consume a
+        packet number. Each call starts over with a fresh StreamState.
+
+        :return: A generator of (packet number, start index, end index, parsed items) tuples.
+        """
+        self.state = StreamState()
+        return self.decoder.iter_packets(self.rawBinary, self.state, complete=True)
 
     def constructGroups(self):
         """
@@ -105,43 +228,14 @@ class KLVParser:
             endIndex = groupStartIndex + self.keylength + length_of_length_field + section_length
             valueStartIndex = groupStartIndex + self.keylength + length_of_length_field
 
-            parsed[packetNum] = []
-
             # Extract the raw packet data for checksum calculation
             raw_packet_data = self.rawBinary[groupStartIndex:endIndex]
 
-            # Parse each KLV item within the packet
-            while valueStartIndex < endIndex:
-                miniSection_length, miniSection_length_of_length_field = self.readBERLength(
-                    self.rawBinary[valueStartIndex + 1:]
-                )
-                parsed[packetNum].append({
-                    'key': self.rawBinary[valueStartIndex],
-                    'length': miniSection_length,
-                    'value': self.rawBinary[
-                        valueStartIndex + 1 + miniSection_length_of_length_field:
-                        valueStartIndex + 1 + miniSection_length_of_length_field + miniSection_length
-                    ],
-                    'raw_item_bytes': self.rawBinary[
-                        valueStartIndex:
-                        valueStartIndex + 1 + miniSection_length_of_length_field + miniSection_length
-                    ]
-                })
-                valueStartIndex += 1 + miniSection_length_of_length_field + miniSection_length
-
-            # Validate checksum if present
-            provided_checksum = None
-            for item in parsed[packetNum]:
-                if item['key'] == 1:  # Checksum key
-                    provided_checksum = int.from_bytes(item['value'], byteorder='big')
-
-            if provided_checksum is not None:
-                calculated_checksum = self.calculate_checksum(raw_packet_data[:-2])  # Exclude the checksum field
-                if calculated_checksum != provided_checksum:
-                    print(f"Packet {packetNum} checksum mismatch: {calculated_checksum} != {provided_checksum}")
-                    del parsed[packetNum]  # Remove the packet if checksum fails
-                    continue
+            items = self.decoder.split_packet(self.rawBinary, valueStartIndex, endIndex, self.state)
+            if not self.decoder.validate_checksum(packetNum, items, raw_packet_data):
+                continue
 
+            parsed[packetNum] = items
             packetNum += 1
 
         return parsed
@@ -181,11 +275,7 @@ class KLVParser:
         :param packet_data: The raw packet data excluding the checksum field itself.
         :return: The calculated 16-bit checksum as an integer.
         """
-        checksum = 0
-        # Perform sum with alternating shifts
-        for i, byte in enumerate(packet_data):
-            checksum += byte << (8 * ((i + 1) % 2))
-        return checksum & 0xFFFF
+        return calculate_checksum(packet_data)
 
 
 # ------------- TESTING ------------- #
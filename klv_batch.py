@@ -0,0 +1,243 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from decoder import StreamState, get_decoder
+from misb0601_decoder import misb0601_key_names, uas_lds_key
+from stream_quality import analyze_file
+
+OUTPUT_FORMATS = ('csv', 'jsonl', 'none')
+
+# CSV columns in MISB0601 key order, excluding the checksum
+CSV_FIELDS = ['Packet'] + list(dict.fromkeys(name for key, name in sorted(misb0601_key_names.items()) if key != 1))
+
+
+def _glob_root(pattern):
+    """The leading directories of a glob pattern that contain no wildcards."""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) if parts != [''] else os.sep
+
+
+def find_inputs(inputs, pattern='*.bin'):
+    """
+    Expand files, directories and glob patterns into a sorted list of recordings.
+
+    Each recording is paired with its path relative to its input root, used to name its
+    output: a directory's contents keep the directory name and their subdirectories, a file
+    keeps its name, and a glob match keeps the part of its path matched by wildcards.
+
+    :param inputs: Paths of files or directories, or glob patterns.
+    :param pattern: The file name pattern searched for in directories, recursively.
+    :return: A sorted list of unique (file path, relative name) tuples.
+    """
+    names = {}
+    for entry in inputs:
+        if os.path.isdir(entry):
+            root = os.path.dirname(os.path.abspath(entry))
+            for path in glob.glob(os.path.join(entry, '**', pattern), recursive=True):
+                names.setdefault(os.path.normpath(path), os.path.relpath(os.path.abspath(path), root))
+        elif os.path.isfile(entry):
+            names.setdefault(os.path.normpath(entry), os.path.basename(entry))
+        else:
+            root = _glob_root(entry)
+            for path in glob.glob(entry, recursive=True):
+                if os.path.isfile(path):
+                    names.setdefault(os.path.normpath(path), os.path.relpath(path, root))
+    return sorted(names.items())
+
+
+def output_collisions(names):
+    """
+    Find relative names shared by more than one recording.
+
+    :param names: The relative names of the recordings, see find_inputs.
+    :return: A sorted list of the names that occur more than once.
+    """
+    seen = set()
+    collisions = set()
+    for name in names:
+        # Output files on case-insensitive file systems collide regardless of case
+        folded = os.path.normcase(os.path.normpath(name))
+        if folded in seen:
+            collisions.add(name)
+        seen.add(folded)
+    return sorted(collisions)
+
+
+def _json_default(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+def _without_nan(value):
+    """Replace NaN floats, which JSON cannot represent, with None throughout a decoded value."""
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, dict):
+        return {name: _without_nan(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_without_nan(item) for item in value]
+    return value
+
+
+def _silence_worker():
+    """
+    Discard the standard output of a worker process. Checksum mismatches are printed by
+    the decoder as they are found; workers report their count in the file statistics
+    instead, so the output does not interleave with the progress lines.
+    """
+    sys.stdout = open(os.devnull, 'w')
+
+
+def decode_file(path, key, output_dir, output_format, use_lookup_tables, use_templates, name=None):
+    """
+    Decode one recording and write its packets in the chosen format.
+
+    Runs in a worker process; packets are written as they are decoded. The output is written
+    to output_dir/name.<format>, creating the subdirectories of name.
+
+    :param name: The relative name of the recording, see find_inputs. Defaults to its file name.
+
+    :return: A dictionary of statistics for the file.
+    """
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        rawBinary = f.read()
+
+    decoder = get_decoder(key, use_lookup_tables, use_templates)
+    state = StreamState()
+    packets = decoder.decode_iter(rawBinary, state, complete=True)
+
+    output_path = None
+    count = 0
+    if output_format == 'none':
+        for count, (packetNum, packet) in enumerate(packets, 1):
+            pass
+    else:
+        output_path = os.path.join(output_dir, (name or os.path.basename(path)) + '.' + output_format)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w', newline='') as out:
+            if output_format == 'csv':
+                writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for count, (packetNum, packet) in enumerate(packets, 1):
+                    packet['Packet'] = packetNum
+                    writer.writerow(packet)
+            else:
+                for count, (packetNum, packet) in enumerate(packets, 1):
+                    packet['Packet'] = packetNum
+                    out.write(json.dumps(_without_nan(packet), default=_json_default, allow_nan=False))
+                    out.write('\n')
+
+    return {
+        'file': path,
+        'output': output_path,
+        'bytes': len(rawBinary),
+        'packets': count,
+        'checksum_failures': state.checksum_failures,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def grade_file(path, key, gap_factor):
+    """
+    Analyze the stream quality of one recording without decoding it, see stream_quality.analyze_quality.
+
+    :return: A dictionary of statistics for the file, including the quality report.
+    """
+    start = time.perf_counter()
+    report = analyze_file(path, key, gap_factor)
+    return {
+        'file': path,
+        'bytes': report.size,
+        'packets': report.packets,
+        'checksum_failures': report.checksum_failures,
+        'elapsed': time.perf_counter() - start,
+        'quality': report.as_dict(),
+    }
+
+
+def _rates(packets, size, elapsed):
+    if elapsed <= 0:
+        return 0.0, 0.0
+    return packets / elapsed, size / elapsed / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode MISB0601 KLV recordings in parallel.")
+    parser.add_argument('inputs', nargs='+', help="Recording files, directories or glob patterns.")
+    parser.add_argument('-o', '--output-dir', default='.', help="Directory for decoded output files.")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='csv', help="Output format.")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument('--pattern', default='*.bin', help="File name pattern used when searching directories.")
+    parser.add_argument('--key', default=bytes(uas_lds_key).hex(), help="UAS LDS Key as hex.")
+    parser.add_argument('--lookup-tables', action='store_true', help="Decode fixed-point fields through lookup tables.")
+    parser.add_argument('--no-templates', action='store_true', help="Disable the packet layout template fast path.")
+    parser.add_argument('--quality', action='store_true',
+                        help="Only grade stream quality, printing one JSON report per file instead of decoding.")
+    parser.add_argument('--gap-factor', type=float, default=3.0,
+                        help="With --quality, how many median packet intervals make a time stamp gap.")
+    args = parser.parse_args(argv)
+
+    inputs = find_inputs(args.inputs, args.pattern)
+    if not inputs:
+        parser.error("no input recordings found")
+    if args.format != 'none' and not args.quality:
+        collisions = output_collisions(name for path, name in inputs)
+        if collisions:
+            parser.error("several recordings would write the same output file: " + ", ".join(collisions))
+        os.makedirs(args.output_dir, exist_ok=True)
+    key = bytes.fromhex(args.key)
+
+    total_packets = 0
+    total_bytes = 0
+    total_failures = 0
+    failed_files = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_silence_worker) as executor:
+        if args.quality:
+            futures = {executor.submit(grade_file, path, key, args.gap_factor): path for path, name in inputs}
+        else:
+            futures = {
+                executor.submit(decode_file, path, key, args.output_dir, args.format,
+                                args.lookup_tables, not args.no_templates, name): path
+                for path, name in inputs
+            }
+        for future in as_completed(futures):
+            try:
+                stats = future.result()
+            except Exception as error:
+                # One unreadable recording does not stop the others
+                failed_files += 1
+                print(f"{futures[future]}: failed, {type(error).__name__}: {error}")
+                continue
+            packets_per_second, mb_per_second = _rates(stats['packets'], stats['bytes'], stats['elapsed'])
+            if args.quality:
+                print(json.dumps({'file': stats['file'], **stats['quality']}))
+            else:
+                print(f"{stats['file']}: {stats['packets']} packets, {stats['checksum_failures']} checksum failures, "
+                      f"{stats['elapsed']:.3f} s, {packets_per_second:.0f} packets/s, {mb_per_second:.2f} MB/s")
+            total_packets += stats['packets']
+            total_bytes += stats['bytes']
+            total_failures += stats['checksum_failures']
+    elapsed = time.perf_counter() - start
+
+    packets_per_second, mb_per_second = _rates(total_packets, total_bytes, elapsed)
+    print(f"Total: {len(inputs)} files, {failed_files} failed, {total_packets} packets, "
+          f"{total_failures} checksum failures, {elapsed:.3f} s, {packets_per_second:.0f} packets/s, "
+          f"{mb_per_second:.2f} MB/s")
+    return 1 if failed_files else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
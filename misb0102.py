@@ -1,8 +1,29 @@
 # misb0102.py
 
+import profiling
+
 class SecurityMetadataLocalSet:
     def __init__(self, raw_binary, security_key):
         self.security_key = security_key
+        self.decode_functions = {
+            1: self.security_classification,
+            2: self.class_country_release_inst,
+            3: self.classifying_country,
+            4: self.security_sci_information,
+            5: self.caveats,
+            6: self.releasing_instructions,
+            7: self.classified_by,
+            8: self.derived_from,
+            9: self.classification_reason,
+            10: self.declassification_date,
+            11: self.classification_markings,
+            12: self.obj_country_code_method,
+            13: self.obj_country_codes,
+            14: self.classification_comments,
+            22: self.version,
+            23: self.class_country_date,
+            24: self.obj_country_code_date
+        }
         self.sec_parsed_keys = self.parse_local_set(raw_binary)
 
     def parse_local_set(self, raw_binary):
@@ -51,26 +72,11 @@ class SecurityMetadataLocalSet:
         return sec_klv_obj_list
 
     def decode_security_item(self, key, value):
-        decode_functions = {
-            1: self.security_classification,
-            2: self.class_country_release_inst,
-            3: self.classifying_country,
-            4: self.security_sci_information,
-            5: self.caveats,
-            6: self.releasing_instructions,
-            7: self.classified_by,
-            8: self.derived_from,
-            9: self.classification_reason,
-            10: self.declassification_date,
-            11: self.classification_markings,
-            12: self.obj_country_code_method,
-            13: self.obj_country_codes,
-            14: self.classification_comments,
-            22: self.version,
-            23: self.class_country_date,
-            24: self.obj_country_code_date
-        }
-        return decode_functions.get(key, lambda x: f"Unknown Key {key}")(value)
+        decode_function = self.decode_functions.get(key, lambda x: f"Unknown Key {key}")
+        profiler = profiling.active_profiler
+        if profiler is not None:
+            return profiler.profile_call('ST0102', key, value, decode_function, value)
+        return decode_function(value)
 
     def security_classification(self, value):
         classifications = {
@@ -158,3 +164,14 @@ class SecurityMetadataLocalSet:
 
     def obj_country_code_date(self, value):
         return value.decode('utf-8').rstrip('\x00')
+
+
+# Security Local Set Universal Key, as referenced from MISB0601 key 48
+security_key = [6, 14, 43, 52, 2, 3, 1, 1, 14, 1, 3, 3, 2, 0, 0, 0]
+
+# A single decoder shared by every caller; it holds no per-packet state
+_shared_decoder = SecurityMetadataLocalSet(b'', security_key)
+
+def decode_security_local_set(raw_binary):
+    """Parses and decodes a Security Local Set (ST0102) value without creating a new decoder."""
+    return _shared_decoder.parse_security_klv(_shared_decoder.parse_local_set(raw_binary))
@@ -1,5 +1,11 @@
-from misb0102 import SecurityMetadataLocalSet
-from misb0903 import VMTIMetadataLocalSet
+import importlib
+import threading
+
+import profiling
+from misb1201 import decode_imapb
+
+# UAS Datalink Local Set (MISB0601) Universal Key
+uas_lds_key = [6, 14, 43, 52, 2, 11, 1, 1, 14, 1, 3, 1, 1, 0, 0, 0]
 
 # Mapping MISB0601 keys to descriptive names
 misb0601_key_names = {
@@ -109,117 +115,101 @@ misb0601_key_names = {
     105: 'Alternate Platform Ellipsoid Height Extended',
 }
 
-def decode_misb0601_item(key, value):
-    # Mapping each key to the corresponding decode function
-    decode_functions = {
-        1: decode_checksum,
-        2: decode_precision_time_stamp,
-        3: decode_mission_id,
-        4: decode_platform_tail_number,
-        5: decode_platform_heading_angle,
-        6: decode_platform_pitch_angle,
-        7: decode_platform_roll_angle,
-        8: decode_platform_true_airspeed,
-        9: decode_platform_indicated_airspeed,
-        10: decode_platform_designation,
-        11: decode_image_source_sensor,
-        12: decode_image_coordinate_system,
-        13: decode_sensor_latitude,
-        14: decode_sensor_longitude,
-        15: decode_sensor_true_altitude,
-        16: decode_sensor_horizontal_field_of_view,
-        17: decode_sensor_vertical_field_of_view,
-        18: decode_sensor_relative_azimuth_angle,
-        19: decode_sensor_relative_elevation_angle,
-        20: decode_sensor_relative_roll_angle,
-        21: decode_slant_range,
-        22: decode_target_width,
-        23: decode_frame_center_latitude,
-        24: decode_frame_center_longitude,
-        25: decode_frame_center_elevation,
-        26: decode_offset_corner_latitude_point_1,
-        27: decode_offset_corner_longitude_point_1,
-        28: decode_offset_corner_latitude_point_2,
-        29: decode_offset_corner_longitude_point_2,
-        30: decode_offset_corner_latitude_point_3,
-        31: decode_offset_corner_longitude_point_3,
-        32: decode_offset_corner_latitude_point_4,
-        33: decode_offset_corner_longitude_point_4,
-        34: decode_icing_detected,
-        35: decode_wind_direction,
-        36: decode_wind_speed,
-        37: decode_static_pressure,
-        38: decode_density_altitude,
-        39: decode_outside_air_temperature,
-        40: decode_target_location_latitude,
-        41: decode_target_location_longitude,
-        42: decode_target_location_elevation,
-        43: decode_target_track_gate_width,
-        44: decode_target_track_gate_height,
-        45: decode_target_error_estimate_ce90,
-        46: decode_target_error_estimate_le90,
-        47: decode_generic_flag_data,
-        48: decode_security_local_set,
-        49: decode_differential_pressure,
-        50: decode_platform_angle_of_attack,
-        51: decode_platform_vertical_speed,
-        52: decode_platform_sideslip_angle,
-        53: decode_airfield_barometric_pressure,
-        54: decode_airfield_elevation,
-        55: decode_relative_humidity,
-        56: decode_platform_ground_speed,
-        57: decode_ground_range,
-        58: decode_platform_fuel_remaining,
-        59: decode_platform_call_sign,
-        60: decode_weapon_load,
-        61: decode_weapon_fired,
-        62: decode_laser_prf_code,
-        63: decode_sensor_field_of_view_name,
-        64: decode_platform_magnetic_heading,
-        65: decode_uas_datalink_ls_version_number,
-        66: decode_deprecated,
-        67: decode_alternate_platform_latitude,
-        68: decode_alternate_platform_longitude,
-        69: decode_alternate_platform_altitude,
-        70: decode_alternate_platform_name,
-        71: decode_alternate_platform_heading,
-        72: decode_event_start_time_utc,
-        73: decode_rvt_local_set,
-        74: decode_vmti_local_set,
-        75: decode_sensor_ellipsoid_height,
-        76: decode_alternate_platform_ellipsoid_height,
-        77: decode_operational_mode,
-        78: decode_frame_center_height_above_ellipsoid,
-        79: decode_sensor_north_velocity,
-        80: decode_sensor_east_velocity,
-        81: decode_image_horizon_pixel_pack,
-        82: decode_offset_corner_latitude_point_1_full,
-        83: decode_offset_corner_longitude_point_1_full,
-        84: decode_offset_corner_latitude_point_2_full,
-        85: decode_offset_corner_longitude_point_2_full,
-        86: decode_offset_corner_latitude_point_3_full,
-        87: decode_offset_corner_longitude_point_3_full,
-        88: decode_offset_corner_latitude_point_4_full,
-        89: decode_offset_corner_longitude_point_4_full,
-        90: decode_platform_pitch_angle_full,
-        91: decode_platform_roll_angle_full,
-        92: decode_platform_angle_of_attack_full,
-        93: decode_platform_sideslip_angle_full,
-        94: decode_miis_core_identifier,
-        95: decode_sar_motion_imagery_metadata,
-        96: decode_target_width_extended,
-        97: decode_reserved,
-        98: decode_reserved,
-        99: decode_reserved,
-        100: decode_reserved,
-        101: decode_reserved,
-        102: decode_reserved,
-        103: decode_density_altitude_extended,
-        104: decode_sensor_ellipsoid_height_extended,
-        105: decode_alternate_platform_ellipsoid_height_extended,
-    }
+# MISB0601 keys holding headings and azimuths in degrees, which wrap around at 360
+misb0601_angle_keys = frozenset([5, 18, 35, 64, 71])
+
+# MISB0601 keys whose 1- or 2-byte values are mapped to floats through fixed
+# constants. Their decoded values can be precomputed into tables indexed by the
+# raw unsigned value of the field.
+lookup_table_keys = frozenset([
+    5, 6, 7, 8, 9, 15, 16, 17, 22, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35,
+    36, 37, 38, 39, 43, 44, 45, 46, 49, 50, 51, 52, 53, 54, 55, 56, 58, 62, 64,
+    65, 69, 71, 75, 76, 78, 79, 80,
+])
+
+# Lookup tables shared by every parser, keyed by (key, value length)
+_lookup_tables = {}
+_lookup_tables_lock = threading.Lock()
+
+def get_lookup_table(key, length):
+    """
+    Return the table of decoded values for a 1- or 2-byte MISB0601 field,
+    building it on first use.
+
+    :param key: A MISB0601 key from lookup_table_keys.
+    :param length: The length of the encoded value in bytes (1 or 2).
+    :return: A list of 256 or 65536 decoded values indexed by the raw value.
+    """
+    table = _lookup_tables.get((key, length))
+    if table is None:
+        with _lookup_tables_lock:
+            table = _lookup_tables.get((key, length))
+            if table is None:
+                table = [_decode_misb0601_item(key, raw.to_bytes(length, byteorder='big'), False)
+                         for raw in range(1 << (8 * length))]
+                _lookup_tables[(key, length)] = table
+    return table
+
+# Decoders of the nested sets embedded in MISB0601 keys, as (module, function) names.
+# A decoder's module is imported the first time its key is decoded, so processes that
+# never see a nested set do not pay for loading it.
+nested_set_decoders = {
+    48: ('misb0102', 'decode_security_local_set'),
+    73: ('misb0806', 'decode_rvt_local_set'),
+    74: ('misb0903', 'decode_vmti_local_set'),
+    95: ('misb1206', 'decode_sar_motion_imagery_local_set'),
+}
+
+# Nested set decoder functions imported so far, keyed by MISB0601 key
+_loaded_nested_set_decoders = {}
+
+def register_nested_set_decoder(key, module_name, function_name):
+    """
+    Register the decoder of a nested set embedded in a MISB0601 key.
+    The module is only imported when the key is first decoded.
+
+    :param key: The MISB0601 key holding the nested set.
+    :param module_name: The name of the module defining the decoder.
+    :param function_name: The name of a function taking the raw value of the key.
+    """
+    nested_set_decoders[key] = (module_name, function_name)
+    _loaded_nested_set_decoders.pop(key, None)
+    misb0601_decode_functions[key] = lambda value: decode_nested_set(key, value)
+
+def get_nested_set_decoder(key):
+    """
+    Return the decoder function of a nested set, importing its module on first use.
+
+    :param key: A MISB0601 key from nested_set_decoders.
+    :return: The decoder function.
+    """
+    function = _loaded_nested_set_decoders.get(key)
+    if function is None:
+        module_name, function_name = nested_set_decoders[key]
+        function = getattr(importlib.import_module(module_name), function_name)
+        _loaded_nested_set_decoders[key] = function
+    return function
+
+def decode_nested_set(key, value):
+    return get_nested_set_decoder(key)(value)
+
+def decode_misb0601_item(key, value, use_lookup_tables=False):
+    # Record the cost of the item when profiling is enabled
+    profiler = profiling.active_profiler
+    if profiler is not None:
+        if key in nested_set_decoders:
+            # Import the nested set decoder before timing, so its one-time import is not counted
+            get_nested_set_decoder(key)
+        return profiler.profile_call('ST0601', key, value, _decode_misb0601_item, key, value, use_lookup_tables)
+    return _decode_misb0601_item(key, value, use_lookup_tables)
+
+def _decode_misb0601_item(key, value, use_lookup_tables):
+    # Fixed-point fields become a single indexed read when lookup tables are enabled
+    if use_lookup_tables and key in lookup_table_keys and 0 < len(value) <= 2:
+        return get_lookup_table(key, len(value))[int.from_bytes(value, byteorder='big')]
+
     # Call the corresponding function if exists
-    return decode_functions.get(key, lambda v: v)(value)
+    return misb0601_decode_functions.get(key, _decode_raw)(value)
 
 # Below are the decoding functions for each MISB0601 key.
 
@@ -419,8 +409,7 @@ def decode_generic_flag_data(value):
 
 def decode_security_local_set(value):
     """Decode the Security Local Set (Key 48) using ST0102."""
-    sec_meta = SecurityMetadataLocalSet(value, security_key=[6, 14, 43, 52, 2, 3, 1, 1, 14, 1, 3, 3, 2, 0, 0, 0])
-    return sec_meta.parse_security_klv(sec_meta.sec_parsed_keys)
+    return decode_nested_set(48, value)
 
 def decode_differential_pressure(value):
     return uint_to_float(value, (0, (2**16) - 1), (0, 5000))
@@ -509,8 +498,7 @@ def decode_event_start_time_utc(value):
 
 def decode_vmti_local_set(value):
     """Decode the VMTI Local Set (Key 74) using ST0903."""
-    vmti_meta = VMTIMetadataLocalSet(value, vmti_key=[6, 14, 43, 52, 2, 11, 1, 1, 14, 1, 3, 3, 6, 0, 0, 0])
-    return vmti_meta.parse_vmti_klv(vmti_meta.vmti_parsed_keys)
+    return decode_nested_set(74, value)
 
 def decode_sensor_ellipsoid_height(byte_seq):
     value = int.from_bytes(byte_seq, byteorder='big', signed=False)
@@ -584,32 +572,44 @@ def decode_platform_sideslip_angle_full(value):
     return int_to_float(value, (-((2**31) - 1), (2**31) - 1), (-90, 90))
 
 def decode_target_width_extended(value):
-    return 'IMAPB'
+    return decode_imapb(value, 0, 1500000)
 
 def decode_density_altitude_extended(value):
-    return 'IMAPB'
+    return decode_imapb(value, -900, 40000)
 
 def decode_sensor_ellipsoid_height_extended(value):
-    return 'IMAPB'
+    return decode_imapb(value, -900, 40000)
 
 def decode_alternate_platform_ellipsoid_height_extended(value):
-    return 'IMAPB'
+    return decode_imapb(value, -900, 40000)
 
 def decode_rvt_local_set(value):
     """
     Decoder for Key 73: RVT Local Set.
     This field is used to embed an ST0806 RVT Local Set.
-    Here we simply return the raw hex string.
     """
-    return f"RVT Local Set: {value.hex()}"
+    return decode_nested_set(73, value)
 
 def decode_image_horizon_pixel_pack(value):
     """
     Decoder for Key 81: Image Horizon Pixel Pack.
-    Without detailed structure, we return the raw hex representation.
-    If the structure is known, you could parse sub-fields here.
+    The start and end points of the horizon line as percentages of the image width and
+    height, optionally followed by their latitudes and longitudes as 4-byte IMAPB values.
     """
-    return f"Image Horizon Pixel Pack: {value.hex()}"
+    if len(value) < 4:
+        return value.hex()
+    pack = {
+        'Start X': value[0],
+        'Start Y': value[1],
+        'End X': value[2],
+        'End Y': value[3],
+    }
+    if len(value) >= 20:
+        pack['Start Latitude'] = decode_imapb(value[4:8], -90, 90)
+        pack['Start Longitude'] = decode_imapb(value[8:12], -180, 180)
+        pack['End Latitude'] = decode_imapb(value[12:16], -90, 90)
+        pack['End Longitude'] = decode_imapb(value[16:20], -180, 180)
+    return pack
 
 def decode_miis_core_identifier(value):
     """
@@ -621,10 +621,9 @@ def decode_miis_core_identifier(value):
 def decode_sar_motion_imagery_metadata(value):
     """
     Decoder for Key 95: SAR Motion Imagery Metadata.
-    This is a nested local set (ST 1206). In this placeholder,
-    we return the raw hex representation.
+    This is a nested local set (ST 1206).
     """
-    return f"SAR Motion Imagery Metadata: {value.hex()}"
+    return decode_nested_set(95, value)
 
 def decode_reserved(value):
     """
@@ -641,3 +640,115 @@ def uint_to_float(value, domain, range_):
 def int_to_float(value, domain, range_):
     raw_value = int.from_bytes(value, byteorder='big', signed=True)
     return (raw_value - domain[0]) * (range_[1] - range_[0]) / (domain[1] - domain[0])
+
+def _decode_raw(value):
+    return value
+
+# Mapping each key to the corresponding decode function, built once at import
+misb0601_decode_functions = {
+    1: decode_checksum,
+    2: decode_precision_time_stamp,
+    3: decode_mission_id,
+    4: decode_platform_tail_number,
+    5: decode_platform_heading_angle,
+    6: decode_platform_pitch_angle,
+    7: decode_platform_roll_angle,
+    8: decode_platform_true_airspeed,
+    9: decode_platform_indicated_airspeed,
+    10: decode_platform_designation,
+    11: decode_image_source_sensor,
+    12: decode_image_coordinate_system,
+    13: decode_sensor_latitude,
+    14: decode_sensor_longitude,
+    15: decode_sensor_true_altitude,
+    16: decode_sensor_horizontal_field_of_view,
+    17: decode_sensor_vertical_field_of_view,
+    18: decode_sensor_relative_azimuth_angle,
+    19: decode_sensor_relative_elevation_angle,
+    20: decode_sensor_relative_roll_angle,
+    21: decode_slant_range,
+    22: decode_target_width,
+    23: decode_frame_center_latitude,
+    24: decode_frame_center_longitude,
+    25: decode_frame_center_elevation,
+    26: decode_offset_corner_latitude_point_1,
+    27: decode_offset_corner_longitude_point_1,
+    28: decode_offset_corner_latitude_point_2,
+    29: decode_offset_corner_longitude_point_2,
+    30: decode_offset_corner_latitude_point_3,
+    31: decode_offset_corner_longitude_point_3,
+    32: decode_offset_corner_latitude_point_4,
+    33: decode_offset_corner_longitude_point_4,
+    34: decode_icing_detected,
+    35: decode_wind_direction,
+    36: decode_wind_speed,
+    37: decode_static_pressure,
+    38: decode_density_altitude,
+    39: decode_outside_air_temperature,
+    40: decode_target_location_latitude,
+    41: decode_target_location_longitude,
+    42: decode_target_location_elevation,
+    43: decode_target_track_gate_width,
+    44: decode_target_track_gate_height,
+    45: decode_target_error_estimate_ce90,
+    46: decode_target_error_estimate_le90,
+    47: decode_generic_flag_data,
+    48: decode_security_local_set,
+    49: decode_differential_pressure,
+    50: decode_platform_angle_of_attack,
+    51: decode_platform_vertical_speed,
+    52: decode_platform_sideslip_angle,
+    53: decode_airfield_barometric_pressure,
+    54: decode_airfield_elevation,
+    55: decode_relative_humidity,
+    56: decode_platform_ground_speed,
+    57: decode_ground_range,
+    58: decode_platform_fuel_remaining,
+    59: decode_platform_call_sign,
+    60: decode_weapon_load,
+    61: decode_weapon_fired,
+    62: decode_laser_prf_code,
+    63: decode_sensor_field_of_view_name,
+    64: decode_platform_magnetic_heading,
+    65: decode_uas_datalink_ls_version_number,
+    66: decode_deprecated,
+    67: decode_alternate_platform_latitude,
+    68: decode_alternate_platform_longitude,
+    69: decode_alternate_platform_altitude,
+    70: decode_alternate_platform_name,
+    71: decode_alternate_platform_heading,
+    72: decode_event_start_time_utc,
+    73: decode_rvt_local_set,
+    74: decode_vmti_local_set,
+    75: decode_sensor_ellipsoid_height,
+    76: decode_alternate_platform_ellipsoid_height,
+    77: decode_operational_mode,
+    78: decode_frame_center_height_above_ellipsoid,
+    79: decode_sensor_north_velocity,
+    80: decode_sensor_east_velocity,
+    81: decode_image_horizon_pixel_pack,
+    82: decode_offset_corner_latitude_point_1_full,
+    83: decode_offset_corner_longitude_point_1_full,
+    84: decode_offset_corner_latitude_point_2_full,
+    85: decode_offset_corner_longitude_point_2_full,
+    86: decode_offset_corner_latitude_point_3_full,
+    87: decode_offset_corner_longitude_point_3_full,
+    88: decode_offset_corner_latitude_point_4_full,
+    89: decode_offset_corner_longitude_point_4_full,
+    90: decode_platform_pitch_angle_full,
+    91: decode_platform_roll_angle_full,
+    92: decode_platform_angle_of_attack_full,
+    93: decode_platform_sideslip_angle_full,
+    94: decode_miis_core_identifier,
+    95: decode_sar_motion_imagery_metadata,
+    96: decode_target_width_extended,
+    97: decode_reserved,
+    98: decode_reserved,
+    99: decode_reserved,
+    100: decode_reserved,
+    101: decode_reserved,
+    102: decode_reserved,
+    103: decode_density_altitude_extended,
+    104: decode_sensor_ellipsoid_height_extended,
+    105: decode_alternate_platform_ellipsoid_height_extended,
+}
@@ -0,0 +1,225 @@
+# misb0806.py
+
+import profiling
+from ber import read_ber_length
+
+# Mapping ST0806 RVT Local Set tags to descriptive names
+rvt_key_names = {
+    1: 'Checksum',
+    2: 'Precision Time Stamp',
+    3: 'Platform True Airspeed',
+    4: 'Platform Indicated Airspeed',
+    5: 'Telemetry Accuracy Indicator',
+    6: 'Frag Circle Radius',
+    7: 'Frame Code',
+    8: 'UAS LDS Version Number',
+    9: 'Video Data Rate',
+    10: 'Digital Video File Format',
+    11: 'User Defined Local Set',
+    12: 'Point of Interest Local Set',
+    13: 'Area of Interest Local Set',
+    14: 'MGRS Zone',
+    15: 'MGRS Latitude Band and Grid Square',
+    16: 'MGRS Easting',
+    17: 'MGRS Northing',
+    18: 'Frame Center MGRS Zone',
+    19: 'Frame Center MGRS Latitude Band and Grid Square',
+    20: 'Frame Center MGRS Easting',
+    21: 'Frame Center MGRS Northing',
+}
+
+# Tags that may appear several times in one RVT Local Set; their values are collected in lists
+repeated_keys = frozenset([11, 12, 13])
+
+poi_key_names = {
+    1: 'POI Number',
+    2: 'POI Latitude',
+    3: 'POI Longitude',
+    4: 'POI Altitude',
+    5: 'POI Name',
+}
+
+aoi_key_names = {
+    1: 'AOI Number',
+    2: 'Corner Latitude Point 1',
+    3: 'Corner Longitude Point 1',
+    4: 'Corner Latitude Point 2',
+    5: 'Corner Longitude Point 2',
+    6: 'AOI Name',
+}
+
+user_data_types = {0: 'String', 1: 'Signed Integer', 2: 'Unsigned Integer', 3: 'Experimental'}
+
+
+def parse_local_set(raw_binary):
+    """
+    Split a local set with 1-byte tags and BER lengths into (tag, value) pairs.
+    Parsing stops at the first item cut off by the end of the data.
+
+    :param raw_binary: The value of the local set.
+    :return: A list of (tag, value) tuples.
+    """
+    items = []
+    i = 0
+    end = len(raw_binary)
+    while i < end:
+        key = raw_binary[i]
+        ber = read_ber_length(raw_binary, i + 1, end)
+        if ber is None:
+            break
+        length, length_of_length_field = ber
+        i += 1 + length_of_length_field
+        if i + length > end:
+            break
+        items.append((key, raw_binary[i:i + length]))
+        i += length
+    return items
+
+
+def _uint(value):
+    return int.from_bytes(value, byteorder='big')
+
+
+def _string(value):
+    return value.decode('utf-8', errors='replace').rstrip('\x00')
+
+
+def _latitude(value):
+    raw = int.from_bytes(value, byteorder='big', signed=True)
+    return raw * 90 / (2**31 - 1) if raw != -2**31 else float('NaN')
+
+
+def _longitude(value):
+    raw = int.from_bytes(value, byteorder='big', signed=True)
+    return raw * 180 / (2**31 - 1) if raw != -2**31 else float('NaN')
+
+
+def _altitude(value):
+    return _uint(value) * 19900 / 65535 - 900
+
+
+class RVTLocalSet:
+    def __init__(self):
+        self.decode_functions = {
+            1: self.checksum,
+            2: self.precision_time_stamp,
+            3: self.platform_true_airspeed,
+            4: self.platform_indicated_airspeed,
+            5: self.telemetry_accuracy_indicator,
+            6: self.frag_circle_radius,
+            7: self.frame_code,
+            8: self.uas_lds_version_number,
+            9: self.video_data_rate,
+            10: self.digital_video_file_format,
+            11: self.user_defined_local_set,
+            12: self.point_of_interest_local_set,
+            13: self.area_of_interest_local_set,
+            14: self.mgrs_zone,
+            15: self.mgrs_latitude_band_and_grid_square,
+            16: self.mgrs_easting,
+            17: self.mgrs_northing,
+            18: self.mgrs_zone,
+            19: self.mgrs_latitude_band_and_grid_square,
+            20: self.mgrs_easting,
+            21: self.mgrs_northing,
+        }
+        self.poi_decode_functions = {1: _uint, 2: _latitude, 3: _longitude, 4: _altitude, 5: _string}
+        self.aoi_decode_functions = {1: _uint, 2: _latitude, 3: _longitude, 4: _latitude, 5: _longitude, 6: _string}
+
+    def decode_local_set(self, raw_binary):
+        """Decodes an RVT Local Set (ST0806) into a dictionary keyed by descriptive field name."""
+        decoded = {}
+        for key, value in parse_local_set(raw_binary):
+            name = rvt_key_names.get(key, f"Unknown Key {key}")
+            decoded_value = self.decode_rvt_item(key, value)
+            if key in repeated_keys:
+                decoded.setdefault(name, []).append(decoded_value)
+            else:
+                decoded[name] = decoded_value
+        return decoded
+
+    def decode_rvt_item(self, key, value):
+        decode_function = self.decode_functions.get(key, bytes.hex)
+        profiler = profiling.active_profiler
+        if profiler is not None:
+            return profiler.profile_call('ST0806', key, value, decode_function, value)
+        return decode_function(value)
+
+    def checksum(self, value):
+        return _uint(value)
+
+    def precision_time_stamp(self, value):
+        return _uint(value) / 1000.0
+
+    def platform_true_airspeed(self, value):
+        return _uint(value)
+
+    def platform_indicated_airspeed(self, value):
+        return _uint(value)
+
+    def telemetry_accuracy_indicator(self, value):
+        return value.hex()
+
+    def frag_circle_radius(self, value):
+        return _uint(value)
+
+    def frame_code(self, value):
+        return _uint(value)
+
+    def uas_lds_version_number(self, value):
+        return _uint(value)
+
+    def video_data_rate(self, value):
+        return _uint(value)
+
+    def digital_video_file_format(self, value):
+        return _string(value)
+
+    def user_defined_local_set(self, value):
+        """
+        Decoder for Key 11: User Defined Local Set.
+        Tag 1 holds the data type (upper 2 bits) and ID (lower 6 bits) of the user data in tag 2.
+        """
+        items = dict(parse_local_set(value))
+        type_id = (items.get(1) or b'\x00')[0]
+        data_type = user_data_types[type_id >> 6]
+        data = items.get(2, b'')
+        if data_type == 'String':
+            data = _string(data)
+        elif data_type == 'Signed Integer':
+            data = int.from_bytes(data, byteorder='big', signed=True)
+        elif data_type == 'Unsigned Integer':
+            data = _uint(data)
+        return {'Data Type': data_type, 'ID': type_id & 0x3F, 'Data': data}
+
+    def point_of_interest_local_set(self, value):
+        return self._decode_nested(value, poi_key_names, self.poi_decode_functions)
+
+    def area_of_interest_local_set(self, value):
+        return self._decode_nested(value, aoi_key_names, self.aoi_decode_functions)
+
+    def _decode_nested(self, value, names, decode_functions):
+        return {
+            names.get(key, f"Unknown Key {key}"): decode_functions.get(key, bytes.hex)(item)
+            for key, item in parse_local_set(value)
+        }
+
+    def mgrs_zone(self, value):
+        return _uint(value)
+
+    def mgrs_latitude_band_and_grid_square(self, value):
+        return _string(value)
+
+    def mgrs_easting(self, value):
+        return _uint(value)
+
+    def mgrs_northing(self, value):
+        return _uint(value)
+
+
+# A single decoder shared by every caller; it holds no per-packet state
+_shared_decoder = RVTLocalSet()
+
+def decode_rvt_local_set(raw_binary):
+    """Decodes an RVT Local Set (ST0806), as embedded in MISB0601 key 73."""
+    return _shared_decoder.decode_local_set(raw_binary)
@@ -1,8 +1,29 @@
 # misb0903.py
 
+import profiling
+from misb1201 import decode_imapb
+
 class VMTIMetadataLocalSet:
     def __init__(self, raw_binary, vmti_key):
         self.vmti_key = vmti_key
+        self.decode_functions = {
+            1: self.checksum,
+            2: self.precision_time_stamp,
+            3: self.vmti_system_name,
+            4: self.vmti_ls_version_num,
+            5: self.total_num_targets_detected,
+            6: self.num_targets_reported,
+            7: self.number_of_rois,
+            8: self.frame_width,
+            9: self.frame_height,
+            10: self.vmti_source_sensor,
+            11: self.vmti_horizontal_fov,
+            12: self.vmti_vertical_fov,
+            13: self.miis_id,
+            101: self.v_target_series,
+            102: self.algorithm_series,
+            103: self.ontology_series
+        }
         self.vmti_parsed_keys = self.parse_local_set(raw_binary)
 
     def parse_local_set(self, raw_binary):
@@ -51,25 +72,11 @@ class VMTIMetadataLocalSet:
         return vmti_klv_obj_list
 
     def decode_vmti_item(self, key, value):
-        decode_functions = {
-            1: self.checksum,
-            2: self.precision_time_stamp,
-            3: self.vmti_system_name,
-            4: self.vmti_ls_version_num,
-            5: self.total_num_targets_detected,
-            6: self.num_targets_reported,
-            7: self.number_of_rois,
-            8: self.frame_width,
-            9: self.frame_height,
-            10: self.vmti_source_sensor,
-            11: self.vmti_horizontal_fov,
-            12: self.vmti_vertical_fov,
-            13: self.miis_id,
-            101: self.v_target_series,
-            102: self.algorithm_series,
-            103: self.ontology_series
-        }
-        return decode_functions.get(key, lambda x: f"Unknown Key {key}")(value)
+        decode_function = self.decode_functions.get(key, lambda x: f"Unknown Key {key}")
+        profiler = profiling.active_profiler
+        if profiler is not None:
+            return profiler.profile_call('ST0903', key, value, decode_function, value)
+        return decode_function(value)
 
     def checksum(self, value):
         return int.from_bytes(value, byteorder='big')
@@ -106,10 +113,10 @@ class VMTIMetadataLocalSet:
         return value.decode('utf-8').rstrip('\x00')
 
     def vmti_horizontal_fov(self, value):
-        return 'IMAPB Required'
+        return decode_imapb(value, 0, 180)
 
     def vmti_vertical_fov(self, value):
-        return 'IMAPB Required'
+        return decode_imapb(value, 0, 180)
 
     def miis_id(self, value):
         return value
@@ -122,3 +129,14 @@ class VMTIMetadataLocalSet:
 
     def ontology_series(self, value):
         return value
+
+
+# VMTI Local Set Universal Key, as referenced from MISB0601 key 74
+vmti_key = [6, 14, 43, 52, 2, 11, 1, 1, 14, 1, 3, 3, 6, 0, 0, 0]
+
+# A single decoder shared by every caller; it holds no per-packet state
+_shared_decoder = VMTIMetadataLocalSet(b'', vmti_key)
+
+def decode_vmti_local_set(raw_binary):
+    """Parses and decodes a VMTI Local Set (ST0903) value without creating a new decoder."""
+    return _shared_decoder.parse_vmti_klv(_shared_decoder.parse_local_set(raw_binary))
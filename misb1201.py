@@ -0,0 +1,35 @@
+import math
+
+
+def decode_imapb(value, minimum, maximum):
+    """
+    Decode a value encoded with the ST1201 floating point to integer mapping (IMAPB).
+
+    The number of bytes of the value is the IMAPB length, so the same field may be sent
+    at different precisions. Encodings with the two most significant bits set are the
+    ST1201 special values (infinities and NaNs).
+
+    :param value: The encoded bytes.
+    :param minimum: The lower bound of the mapped range.
+    :param maximum: The upper bound of the mapped range.
+    :return: The decoded float.
+    """
+    length = len(value)
+    if length == 0:
+        return float('NaN')
+    raw = int.from_bytes(value, byteorder='big')
+
+    first_byte = value[0]
+    if first_byte & 0xC0 == 0xC0:
+        if first_byte & 0x10 == 0 and first_byte & 0x08:
+            return float('-inf') if first_byte & 0x20 else float('inf')
+        return float('NaN')
+
+    b_pow = math.ceil(math.log2(maximum - minimum))
+    d_pow = 8 * length - 1
+    s_f = 2.0 ** (d_pow - b_pow)
+    s_r = 2.0 ** (b_pow - d_pow)
+    z_offset = 0.0
+    if minimum < 0 and s_f * minimum != math.floor(s_f * minimum):
+        z_offset = s_f * minimum - math.floor(s_f * minimum)
+    return s_r * (raw - z_offset) + minimum
@@ -0,0 +1,115 @@
+# misb1206.py
+
+from functools import partial
+
+import profiling
+from misb0806 import parse_local_set
+from misb1201 import decode_imapb
+
+# Mapping ST1206 SAR Motion Imagery Local Set tags to descriptive names
+sar_key_names = {
+    1: 'Grazing Angle',
+    2: 'Ground Plane Squint Angle',
+    3: 'Look Angle',
+    4: 'Image Plane',
+    5: 'Range Resolution',
+    6: 'Cross Range Resolution',
+    7: 'Range Image Plane Pixel Size',
+    8: 'Cross Range Image Plane Pixel Size',
+    9: 'Image Rows',
+    10: 'Image Columns',
+    11: 'Range Direction Angle Relative to True North',
+    12: 'True North Direction Relative to Top Image Edge',
+    13: 'Range Layover Angle Relative to True North',
+    14: 'Ground Aperture Angular Extent',
+    15: 'Aperture Duration',
+    16: 'Ground Track Angle',
+    17: 'Minimum Detectable Velocity',
+    18: 'True Pulse Repetition Frequency',
+    19: 'Pulse Repetition Frequency Scale Factor',
+    20: 'Transmit RF Center Frequency',
+    21: 'Transmit RF Bandwidth',
+    22: 'Radar Cross Section Scale Factor',
+    23: 'Reference Frame Precision Time Stamp',
+    24: 'Reference Frame Grazing Angle',
+    25: 'Reference Frame Ground Plane Squint Angle',
+    26: 'Reference Frame Range Direction Angle Relative to True North',
+    27: 'Reference Frame Range Layover Angle Relative to True North',
+    28: 'Document Version',
+}
+
+# IMAPB (ST1201) bounds of the floating point fields
+sar_imapb_ranges = {
+    1: (0, 90),
+    2: (-90, 90),
+    3: (-180, 180),
+    5: (0, 1e6),
+    6: (0, 1e6),
+    7: (0, 1e6),
+    8: (0, 1e6),
+    11: (0, 360),
+    12: (0, 360),
+    13: (0, 360),
+    14: (0, 90),
+    16: (0, 360),
+    17: (0, 100),
+    18: (0, 1e6),
+    19: (0, 1),
+    20: (0, 1e6),
+    21: (0, 1e6),
+    22: (0, 1),
+    24: (0, 90),
+    25: (-90, 90),
+    26: (0, 360),
+    27: (0, 360),
+}
+
+image_planes = {0: 'Ground', 1: 'Slant'}
+
+
+def _uint(value):
+    return int.from_bytes(value, byteorder='big')
+
+
+class SARMotionImageryLocalSet:
+    def __init__(self):
+        self.decode_functions = {
+            key: partial(decode_imapb, minimum=minimum, maximum=maximum)
+            for key, (minimum, maximum) in sar_imapb_ranges.items()
+        }
+        self.decode_functions.update({
+            4: self.image_plane,
+            9: _uint,
+            10: _uint,
+            15: _uint,
+            23: self.precision_time_stamp,
+            28: _uint,
+        })
+
+    def decode_local_set(self, raw_binary):
+        """Decodes a SAR Motion Imagery Local Set (ST1206) into a dictionary keyed by descriptive field name."""
+        return {
+            sar_key_names.get(key, f"Unknown Key {key}"): self.decode_sar_item(key, value)
+            for key, value in parse_local_set(raw_binary)
+        }
+
+    def decode_sar_item(self, key, value):
+        decode_function = self.decode_functions.get(key, bytes.hex)
+        profiler = profiling.active_profiler
+        if profiler is not None:
+            return profiler.profile_call('ST1206', key, value, decode_function, value)
+        return decode_function(value)
+
+    def image_plane(self, value):
+        return image_planes.get(_uint(value), 'Unknown')
+
+    def precision_time_stamp(self, value):
+        return _uint(value) / 1000.0
+
+
+# A single decoder shared by every caller; it holds no per-packet state
+_shared_decoder = SARMotionImageryLocalSet()
+
+def decode_sar_motion_imagery_local_set(raw_binary):
+    """Decodes a SAR Motion Imagery Local Set (ST1206), as embedded in MISB0601 key 95."""
+    return _shared_decoder.decode_local_set(raw_binary)
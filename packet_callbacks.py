@@ -0,0 +1,147 @@
+import math
+import threading
+import time
+
+
+class LatencyHistogram:
+    """
+    A log-bucketed latency histogram.
+
+    Bucket bounds grow by a constant factor (5% by default), so percentiles are reported
+    with bounded relative error at any scale, from sub-microsecond to seconds, while
+    recording a sample stays O(1).
+    """
+
+    def __init__(self, resolution=1.05, minimum=1e-7):
+        """
+        Initialize the LatencyHistogram.
+
+        :param resolution: The ratio between consecutive bucket bounds.
+        :param minimum: The upper bound in seconds of the first bucket.
+        """
+        self.resolution = resolution
+        self.minimum = minimum
+        self._log_resolution = math.log(resolution)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard all recorded samples."""
+        with self._lock:
+            self.counts = {}
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def record(self, seconds):
+        """
+        Add one latency sample.
+
+        :param seconds: The latency in seconds.
+        """
+        if seconds <= self.minimum:
+            bucket = 0
+        else:
+            bucket = int(math.log(seconds / self.minimum) / self._log_resolution) + 1
+        with self._lock:
+            self.counts[bucket] = self.counts.get(bucket, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, percent):
+        """
+        Return the latency below which a given percentage of samples fall.
+
+        :param percent: The percentile, between 0 and 100.
+        :return: The upper bound of the bucket holding the percentile, capped at the maximum sample.
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, math.ceil(self.count * percent / 100.0))
+            seen = 0
+            for bucket in sorted(self.counts):
+                seen += self.counts[bucket]
+                if seen >= rank:
+                    return min(self.minimum * self.resolution ** bucket, self.max)
+            return self.max
+
+    def summary(self):
+        """
+        Summarize the recorded latencies.
+
+        :return: A dictionary with the sample count, mean, p50, p90, p99 and max in seconds.
+        """
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class PacketDispatcher:
+    """
+    Delivers decoded packets to subscribed callbacks as soon as they are validated.
+
+    Plain callables are called synchronously in the decoding thread. Coroutine functions
+    are scheduled on an asyncio event loop: the one passed when subscribing, or the loop
+    running in the subscribing thread. The time from a packet's arrival to the start of
+    each callback is recorded in a LatencyHistogram.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self.latency = LatencyHistogram()
+
+    def subscribe(self, callback, loop=None):
+        """
+        Register a callback(packet_number, packet).
+
+        :param callback: A callable or a coroutine function.
+        :param loop: The event loop to run a coroutine function on.
+        :return: The callback, for use with unsubscribe.
+        """
+        # asyncio is only imported by processes that subscribe coroutines, as it is slow to import
+        import inspect
+
+        if inspect.iscoroutinefunction(callback):
+            if loop is None:
+                import asyncio
+
+                loop = asyncio.get_running_loop()
+        else:
+            loop = None
+        self.subscribers.append((callback, loop))
+        return callback
+
+    def unsubscribe(self, callback):
+        """
+        Remove a callback registered with subscribe.
+        """
+        self.subscribers = [entry for entry in self.subscribers if entry[0] is not callback]
+
+    def dispatch(self, packetNum, packet, arrival_time):
+        """
+        Deliver a packet to every subscriber.
+
+        :param packetNum: The packet number.
+        :param packet: The decoded packet.
+        :param arrival_time: The time.perf_counter() value at which the packet's bytes arrived.
+        """
+        for callback, loop in self.subscribers:
+            if loop is None:
+                self.latency.record(time.perf_counter() - arrival_time)
+                callback(packetNum, packet)
+            else:
+                import asyncio
+
+                asyncio.run_coroutine_threadsafe(self._run_async(callback, packetNum, packet, arrival_time), loop)
+
+    async def _run_async(self, callback, packetNum, packet, arrival_time):
+        self.latency.record(time.perf_counter() - arrival_time)
+        await callback(packetNum, packet)
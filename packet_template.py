@@ -0,0 +1,72 @@
+import struct
+
+
+class PacketTemplate:
+    """
+    A precompiled unpacker for a recurring MISB0601 packet layout.
+
+    Encoders typically emit the same ordered tag set with the same lengths in every
+    packet. Once such a layout has been seen, a single struct.Struct can split a whole
+    packet value into its items in one unpack_from call instead of walking the BER
+    lengths item by item. The key and length bytes of every item are unpacked as well
+    and compared against the template, so a packet with a different layout is detected
+    and left to the generic tokenizer.
+    """
+
+    def __init__(self, headers, lengths):
+        """
+        Initialize the PacketTemplate.
+
+        :param headers: The key and BER length bytes of each item, in packet order.
+        :param lengths: The value length of each item, in packet order.
+        """
+        self.headers = tuple(headers)
+        self.lengths = tuple(lengths)
+        self.keys = tuple(header[0] for header in self.headers)
+        self.struct = struct.Struct('>' + ''.join(
+            f"{len(header)}s{length}s" for header, length in zip(self.headers, self.lengths)
+        ))
+        self.size = self.struct.size
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Build a template from the items of a packet tokenized by KLVParser.parseGroups.
+
+        :param items: A list of parsed items with 'value' and 'raw_item_bytes' entries.
+        :return: A PacketTemplate matching the layout of the items.
+        """
+        headers = []
+        lengths = []
+        for item in items:
+            raw_item_bytes = item['raw_item_bytes']
+            headers.append(bytes(raw_item_bytes[:len(raw_item_bytes) - len(item['value'])]))
+            lengths.append(len(item['value']))
+        return cls(headers, lengths)
+
+    def unpack(self, data, offset, length):
+        """
+        Split a packet value into its items if it matches this template.
+
+        :param data: The raw binary data containing the packet.
+        :param offset: The offset of the first item of the packet value.
+        :param length: The length of the packet value.
+        :return: A list of parsed items, or None if the packet does not match the layout.
+        """
+        if length != self.size or offset + length > len(data):
+            return None
+
+        fields = self.struct.unpack_from(data, offset)
+        if fields[0::2] != self.headers:
+            return None
+
+        return [
+            {'key': key, 'length': length, 'value': value, 'raw_item_bytes': header + value}
+            for key, length, header, value in zip(self.keys, self.lengths, self.headers, fields[1::2])
+        ]
+
+    def __eq__(self, other):
+        return isinstance(other, PacketTemplate) and self.headers == other.headers and self.lengths == other.lengths
+
+    def __hash__(self):
+        return hash((self.headers, self.lengths))
@@ -0,0 +1,166 @@
+import threading
+from time import perf_counter_ns
+
+# The profiler item decoders report to, or None when profiling is disabled. Decoders
+# check this once per item, so disabled profiling costs a single attribute lookup.
+active_profiler = None
+
+
+class DecodeProfiler:
+    """
+    Collects call counts, decode time and bytes per tag for the MISB item decoders.
+
+    Statistics are keyed by (standard, tag), where standard is 'ST0601', 'ST0102',
+    'ST0806', 'ST0903' or 'ST1206'. The total time of a MISB0601 tag that holds a nested
+    set includes the time of the nested items, which are also reported under their own
+    standard. Self time excludes it, so self times add up to the overall decode time.
+    """
+
+    def __init__(self):
+        # (standard, tag) -> [calls, total nanoseconds, bytes, self nanoseconds]
+        self.stats = {}
+        self._lock = threading.Lock()
+        # Per thread, the time of nested calls made by each profiled call in progress
+        self._local = threading.local()
+
+    def profile_call(self, standard, tag, value, func, *args):
+        """
+        Call an item decoder and record its cost.
+
+        :param standard: The MISB standard of the item.
+        :param tag: The item's tag.
+        :param value: The raw item value, used for the byte count.
+        :param func: The decoder to call.
+        :param args: The arguments to call func with.
+        :return: The result of func.
+        """
+        nested = getattr(self._local, 'nested', None)
+        if nested is None:
+            nested = self._local.nested = []
+        nested.append(0)
+        start = perf_counter_ns()
+        try:
+            result = func(*args)
+        finally:
+            elapsed = perf_counter_ns() - start
+            nested_ns = nested.pop()
+        if nested:
+            nested[-1] += elapsed
+        with self._lock:
+            entry = self.stats.get((standard, tag))
+            if entry is None:
+                entry = self.stats[(standard, tag)] = [0, 0, 0, 0]
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] += len(value)
+            entry[3] += elapsed - nested_ns
+        return result
+
+    def reset(self):
+        """Discard all collected statistics."""
+        with self._lock:
+            self.stats.clear()
+
+    def report(self, names=None):
+        """
+        Rank tags by self time, i.e. decode time excluding the items of nested sets.
+
+        :param names: Optional dictionary mapping (standard, tag) to a descriptive name.
+        :return: A list of dictionaries, most expensive tag first. 'share' is the tag's part
+            of the summed self time, so the shares add up to 100%.
+        """
+        if names is None:
+            names = default_tag_names()
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self.stats.items()]
+        grand_total = sum(entry[3] for key, entry in items) or 1
+
+        rows = []
+        for (standard, tag), (calls, total_ns, size, self_ns) in items:
+            rows.append({
+                'standard': standard,
+                'tag': tag,
+                'name': names.get((standard, tag), f"Unknown Key {tag}"),
+                'calls': calls,
+                'total_seconds': total_ns / 1e9,
+                'self_seconds': self_ns / 1e9,
+                'average_ns': total_ns / calls,
+                'bytes': size,
+                'share': self_ns / grand_total,
+            })
+        rows.sort(key=lambda row: row['self_seconds'], reverse=True)
+        return rows
+
+    def report_json(self, names=None):
+        """
+        Return the ranking of report as a JSON document.
+        """
+        import json
+
+        return json.dumps(self.report(names), indent=2)
+
+    def report_text(self, limit=None, names=None):
+        """
+        Return the ranking of report as a text table.
+
+        :param limit: The number of tags to include, or None for all of them.
+        """
+        rows = self.report(names)
+        if limit is not None:
+            rows = rows[:limit]
+        lines = [f"{'Standard':<8} {'Tag':>4}  {'Name':<40} {'Calls':>9} {'Total ms':>10} {'Self ms':>10} "
+                 f"{'Avg ns':>9} {'Bytes':>10} {'Share':>6}"]
+        for row in rows:
+            lines.append(
+                f"{row['standard']:<8} {row['tag']:>4}  {row['name'][:40]:<40} {row['calls']:>9} "
+                f"{row['total_seconds'] * 1e3:>10.3f} {row['self_seconds'] * 1e3:>10.3f} "
+                f"{row['average_ns']:>9.0f} {row['bytes']:>10} {row['share']:>6.1%}"
+            )
+        return '\n'.join(lines)
+
+
+def default_tag_names():
+    """
+    Return descriptive names for the MISB0601 tags and the tags of the nested sets.
+    ST0102/ST0903 tags are named after their decoder methods.
+
+    :return: A dictionary mapping (standard, tag) to the tag's name.
+    """
+    from misb0102 import SecurityMetadataLocalSet
+    from misb0903 import VMTIMetadataLocalSet
+    from misb0601_decoder import misb0601_key_names
+    from misb0806 import rvt_key_names
+    from misb1206 import sar_key_names
+
+    names = {('ST0601', tag): name for tag, name in misb0601_key_names.items()}
+    names.update({('ST0806', tag): name for tag, name in rvt_key_names.items()})
+    names.update({('ST1206', tag): name for tag, name in sar_key_names.items()})
+    for standard, local_set in (('ST0102', SecurityMetadataLocalSet(b'', None)),
+                                ('ST0903', VMTIMetadataLocalSet(b'', None))):
+        for tag, function in local_set.decode_functions.items():
+            names[(standard, tag)] = function.__name__.replace('_', ' ').title()
+    return names
+
+
+def enable_profiling(profiler=None):
+    """
+    Start reporting item decode costs to a profiler.
+
+    :param profiler: The DecodeProfiler to use. A new one is created if omitted.
+    :return: The active DecodeProfiler.
+    """
+    global active_profiler
+    active_profiler = profiler if profiler is not None else DecodeProfiler()
+    return active_profiler
+
+
+def disable_profiling():
+    """
+    Stop profiling.
+
+    :return: The DecodeProfiler that was active, or None.
+    """
+    global active_profiler
+    profiler = active_profiler
+    active_profiler = None
+    return profiler
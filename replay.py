@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import bisect
+import time
+
+import numpy as np
+
+from decoder import get_decoder
+from misb0601_decoder import uas_lds_key
+from packet_callbacks import LatencyHistogram
+from stream_quality import index_packets, read_time_stamps
+
+PROTOCOLS = ('udp', 'tcp')
+
+# The most packets sent in one burst before yielding to other replays
+MAX_BURST = 256
+# Pause unpaced UDP sends while this many bytes wait in the transport buffer
+UDP_BUFFER_LIMIT = 1 << 20
+
+
+def load_schedule(data, key):
+    """
+    Locate the packets of a recording and compute when each one is due.
+
+    Packets are sent as they were recorded, including those with a bad checksum. A packet
+    without a Precision Time Stamp, or with one earlier than a previous packet, is due
+    together with the packet before it.
+
+    :param data: A bytes-like buffer holding the recording.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :return: A tuple of arrays (start offsets, end offsets, seconds from the first packet).
+    """
+    decoder = get_decoder(key, False, False)
+    starts, value_starts, ends = index_packets(decoder, data)
+    time_stamps = read_time_stamps(data, value_starts, ends).astype(np.float64)
+    time_stamps[time_stamps < 0] = np.nan
+    if np.isnan(time_stamps).all():
+        return starts, ends, np.zeros(len(starts))
+
+    # fmax skips NaN, so the running maximum carries the last time stamp forward
+    clock = np.fmax.accumulate(time_stamps)
+    first = time_stamps[~np.isnan(time_stamps)][0]
+    offsets = np.nan_to_num((clock - first) / 1e6, nan=0.0)
+    return starts, ends, offsets
+
+
+class Replay:
+    """
+    Replays the packets of one recording to a UDP or TCP endpoint, paced by their Precision Time Stamps.
+
+    Packets due at the same moment are sent in one burst, and the replay sleeps on the event
+    loop until the next packet is due, so many replays can run in one process. With a speed
+    of None packets are sent as fast as the transport accepts them. Each UDP datagram holds
+    one packet; TCP sends the packets back to back on one connection.
+    """
+
+    def __init__(self, data, key, host, port, protocol='udp', speed=1.0, loops=1, name=None):
+        """
+        Initialize the Replay.
+
+        :param data: A bytes-like buffer holding the recording.
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param host: The host packets are sent to.
+        :param port: The port packets are sent to.
+        :param protocol: 'udp' or 'tcp'.
+        :param speed: The replay speed relative to real time, e.g. 10 for 10x, or None for max rate.
+        :param loops: The number of times the recording is replayed.
+        :param name: A name identifying the replay in reports.
+        """
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol {protocol!r}, expected one of {PROTOCOLS}")
+        self.data = memoryview(data)
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.speed = speed
+        self.loops = loops
+        self.name = name or f"{protocol}://{host}:{port}"
+        self.starts, self.ends, offsets = load_schedule(data, key)
+        self.schedule = (offsets / speed).tolist() if speed else None
+
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.elapsed = 0.0
+        # How late packets were sent relative to their schedule
+        self.lag = LatencyHistogram()
+
+    async def run(self):
+        """
+        Connect, replay the recording and close the connection.
+
+        :return: The statistics of the replay, see stats.
+        """
+        loop = asyncio.get_running_loop()
+        if self.protocol == 'udp':
+            transport, protocol = await loop.create_datagram_endpoint(
+                asyncio.DatagramProtocol, remote_addr=(self.host, self.port))
+            writer = None
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            transport = writer.transport
+
+        start = time.perf_counter()
+        try:
+            for _ in range(self.loops):
+                await self._replay_once(transport, writer)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            if writer is not None:
+                writer.close()
+                await writer.wait_closed()
+            else:
+                transport.close()
+        return self.stats()
+
+    async def _replay_once(self, transport, writer):
+        data = self.data
+        starts = self.starts.tolist()
+        ends = self.ends.tolist()
+        schedule = self.schedule
+        count = len(starts)
+        send = transport.sendto if writer is None else writer.write
+        base = time.perf_counter()
+
+        index = 0
+        while index < count:
+            if schedule is None:
+                due = min(count, index + MAX_BURST)
+            else:
+                now = time.perf_counter() - base
+                due = min(bisect.bisect_right(schedule, now, index), index + MAX_BURST)
+                if due <= index:
+                    await asyncio.sleep(schedule[index] - now)
+                    continue
+
+            sent_at = time.perf_counter() - base
+            for i in range(index, due):
+                send(data[starts[i]:ends[i]])
+                self.bytes_sent += ends[i] - starts[i]
+            if schedule is not None:
+                for i in range(index, due):
+                    self.lag.record(max(sent_at - schedule[i], 0.0))
+            self.packets_sent += due - index
+            index = due
+
+            if writer is not None:
+                await writer.drain()
+            elif schedule is None and transport.get_write_buffer_size() > UDP_BUFFER_LIMIT:
+                await asyncio.sleep(0.001)
+            else:
+                await asyncio.sleep(0)
+
+    def stats(self):
+        """
+        Report what the replay achieved.
+
+        :return: A dictionary with the packets and bytes sent, the elapsed seconds, the achieved
+            packet and byte rates, the rate the schedule asked for, and the p50/p99/max send lag.
+        """
+        lag = self.lag.summary()
+        target_rate = None
+        if self.schedule is not None and len(self.schedule) > 1 and self.schedule[-1] > 0:
+            target_rate = (len(self.schedule) - 1) / self.schedule[-1]
+        return {
+            'name': self.name,
+            'packets': self.packets_sent,
+            'bytes': self.bytes_sent,
+            'elapsed': self.elapsed,
+            'packets_per_second': self.packets_sent / self.elapsed if self.elapsed > 0 else 0.0,
+            'bytes_per_second': self.bytes_sent / self.elapsed if self.elapsed > 0 else 0.0,
+            'target_packets_per_second': target_rate,
+            'p50_lag': lag['p50'],
+            'p99_lag': lag['p99'],
+            'max_lag': lag['max'],
+        }
+
+
+async def run_replays(replays):
+    """
+    Run several replays concurrently on the current event loop.
+
+    :param replays: The Replay objects to run.
+    :return: A list of their statistics, in the same order.
+    """
+    return await asyncio.gather(*(replay.run() for replay in replays))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay MISB0601 KLV recordings over UDP or TCP at a paced rate.")
+    parser.add_argument('inputs', nargs='+', help="Recording files to replay.")
+    parser.add_argument('--host', default='127.0.0.1', help="Destination host.")
+    parser.add_argument('--port', type=int, default=15000, help="Destination port of the first replay.")
+    parser.add_argument('--port-step', type=int, default=0,
+                        help="Port increment between replays, 0 to send every replay to the same port.")
+    parser.add_argument('-p', '--protocol', choices=PROTOCOLS, default='udp', help="Transport protocol.")
+    parser.add_argument('-s', '--speed', type=float, default=1.0,
+                        help="Replay speed relative to real time, 0 for max rate.")
+    parser.add_argument('-n', '--copies', type=int, default=1, help="Simultaneous replays of each recording.")
+    parser.add_argument('--loops', type=int, default=1, help="Times each replay repeats its recording.")
+    parser.add_argument('--key', default=bytes(uas_lds_key).hex(), help="UAS LDS Key as hex.")
+    args = parser.parse_args(argv)
+
+    key = bytes.fromhex(args.key)
+    replays = []
+    for path in args.inputs:
+        with open(path, 'rb') as f:
+            data = f.read()
+        for copy in range(args.copies):
+            port = args.port + len(replays) * args.port_step
+            replays.append(Replay(data, key, args.host, port, args.protocol, args.speed or None, args.loops,
+                                  name=f"{path}#{copy} -> {args.protocol}://{args.host}:{port}"))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_replays(replays))
+    elapsed = time.perf_counter() - start
+
+    for stats in results:
+        print(f"{stats['name']}: {stats['packets']} packets, {stats['elapsed']:.3f} s, "
+              f"{stats['packets_per_second']:.0f} packets/s, {stats['bytes_per_second'] / 1e6:.2f} MB/s, "
+              f"p99 lag {stats['p99_lag'] * 1e3:.1f} ms")
+    total_packets = sum(stats['packets'] for stats in results)
+    total_bytes = sum(stats['bytes'] for stats in results)
+    print(f"Total: {len(results)} replays, {total_packets} packets, {elapsed:.3f} s, "
+          f"{total_packets / elapsed:.0f} packets/s, {total_bytes / elapsed / 1e6:.2f} MB/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
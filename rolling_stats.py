@@ -0,0 +1,210 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from misb0601_decoder import misb0601_angle_keys, misb0601_key_names
+
+# Platform True Airspeed, Sensor True Altitude, Slant Range, Wind Direction, Wind Speed, Platform Fuel Remaining
+ROLLING_KEYS = (8, 15, 21, 35, 36, 58)
+
+_TIME_STAMP_NAME = misb0601_key_names[2]
+
+
+class RollingAggregator:
+    """
+    Maintains mean, min, max and standard deviation of numeric MISB0601 fields over the last
+    `window` seconds of Precision Time Stamps.
+
+    Samples are kept in preallocated NumPy ring arrays. Each new packet evicts the samples
+    that left the window and updates the running statistics of each field: a sliding
+    Welford mean and variance, and monotonic queues for the minimum and maximum. Each packet
+    is added and later evicted exactly once, so updates are O(1) amortized and the window is
+    never rescanned. Headings and azimuths (misb0601_angle_keys) get a circular mean and
+    standard deviation.
+
+    Feed it from a parser with `parser.on_packet(aggregator.add_packet)`, or from a
+    StreamManager feed's on_packet callback.
+    """
+
+    def __init__(self, window=10.0, keys=ROLLING_KEYS, capacity=1024):
+        """
+        Initialize the RollingAggregator.
+
+        :param window: The window length in seconds.
+        :param keys: The MISB0601 keys aggregated.
+        :param capacity: The initial number of samples the ring arrays hold. They grow when
+            more samples than this fall within one window.
+        """
+        self.window_ms = window * 1e3
+        self.keys = tuple(keys)
+        self.names = tuple(misb0601_key_names[key] for key in self.keys)
+        self._angles = [key in misb0601_angle_keys for key in self.keys]
+        self._indices = {name: i for i, name in enumerate(self.names)}
+
+        count = len(self.keys)
+        self._times = np.empty(capacity)
+        self._values = np.empty((capacity, count))
+        # Sequence numbers of the oldest sample in the window and of the next sample
+        self._start = 0
+        self._end = 0
+        self.latest_time = -math.inf
+
+        # Running statistics per field, kept as Python floats since they are updated one sample at a time
+        self._count = [0] * count
+        self._mean = [0.0] * count
+        self._m2 = [0.0] * count
+        self._sin = [0.0] * count
+        self._cos = [0.0] * count
+        # (sequence number, value) pairs with increasing values (minima) or decreasing values (maxima)
+        self._minima = [deque() for _ in self.keys]
+        self._maxima = [deque() for _ in self.keys]
+
+    def __len__(self):
+        return self._end - self._start
+
+    def add(self, time_stamp, values):
+        """
+        Add one sample.
+
+        :param time_stamp: The Precision Time Stamp in milliseconds, as decoded.
+        :param values: The values of self.keys, NaN where the packet lacked the field.
+        """
+        if math.isnan(time_stamp):
+            return
+        if time_stamp > self.latest_time:
+            self.latest_time = time_stamp
+        self._evict(self.latest_time - self.window_ms)
+
+        capacity = len(self._times)
+        if self._end - self._start == capacity:
+            self._grow()
+            capacity = len(self._times)
+        sequence = self._end
+        slot = sequence % capacity
+        self._times[slot] = time_stamp
+        self._values[slot] = values
+        self._end += 1
+
+        for i, value in enumerate(values):
+            if value != value:
+                continue
+            value = float(value)
+            # Sliding Welford update
+            count = self._count[i] + 1
+            mean = self._mean[i]
+            delta = value - mean
+            mean += delta / count
+            self._m2[i] += delta * (value - mean)
+            self._mean[i] = mean
+            self._count[i] = count
+            if self._angles[i]:
+                self._sin[i] += math.sin(math.radians(value))
+                self._cos[i] += math.cos(math.radians(value))
+
+            minima = self._minima[i]
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((sequence, value))
+            maxima = self._maxima[i]
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((sequence, value))
+
+    def add_packet(self, packetNum, packet):
+        """
+        Add a decoded packet. Packets without a Precision Time Stamp are ignored.
+
+        :param packetNum: The packet number.
+        :param packet: The decoded packet.
+        """
+        time_stamp = packet.get(_TIME_STAMP_NAME)
+        if time_stamp is None:
+            return
+        values = [math.nan] * len(self.keys)
+        indices = self._indices
+        for name, value in packet.items():
+            index = indices.get(name)
+            if index is not None and isinstance(value, (int, float)):
+                values[index] = value
+        self.add(time_stamp, values)
+
+    def add_columns(self, columns):
+        """
+        Add every packet of a batch of columns, as returned by columns.read_columns.
+
+        :param columns: A dictionary of arrays holding key 2 and self.keys.
+        """
+        table = np.column_stack([columns[key] for key in self.keys]).tolist()
+        for time_stamp, values in zip(columns[2].tolist(), table):
+            self.add(time_stamp, values)
+
+    def _evict(self, cutoff):
+        """Remove the samples older than cutoff."""
+        capacity = len(self._times)
+        times = self._times
+        while self._start < self._end and times[self._start % capacity] < cutoff:
+            sequence = self._start
+            for i, value in enumerate(self._values[sequence % capacity].tolist()):
+                if value != value:
+                    continue
+                count = self._count[i] - 1
+                if count == 0:
+                    self._mean[i] = self._m2[i] = self._sin[i] = self._cos[i] = 0.0
+                else:
+                    mean = self._mean[i]
+                    delta = value - mean
+                    mean -= delta / count
+                    self._m2[i] -= delta * (value - mean)
+                    self._mean[i] = mean
+                    if self._angles[i]:
+                        self._sin[i] -= math.sin(math.radians(value))
+                        self._cos[i] -= math.cos(math.radians(value))
+                self._count[i] = count
+
+                if self._minima[i][0][0] == sequence:
+                    self._minima[i].popleft()
+                if self._maxima[i][0][0] == sequence:
+                    self._maxima[i].popleft()
+            self._start += 1
+
+    def _grow(self):
+        """Double the ring arrays, keeping the samples in sequence order."""
+        capacity = len(self._times)
+        order = np.arange(self._start, self._end) % capacity
+        times = np.empty(capacity * 2)
+        values = np.empty((capacity * 2, len(self.keys)))
+        slots = np.arange(self._start, self._end) % (capacity * 2)
+        times[slots] = self._times[order]
+        values[slots] = self._values[order]
+        self._times = times
+        self._values = values
+
+    def stats(self):
+        """
+        Report the statistics of the current window.
+
+        :return: A dictionary keyed by field name of dictionaries with 'count', 'mean', 'min',
+            'max' and 'std'. Statistics of fields without samples in the window are NaN.
+        """
+        count = np.array(self._count, dtype=np.float64)
+        angles = np.array(self._angles)
+        sin = np.array(self._sin)
+        cos = np.array(self._cos)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, self._mean, np.nan)
+            std = np.sqrt(np.maximum(self._m2, 0.0) / count)
+            resultant = np.minimum(np.hypot(sin, cos) / count, 1.0)
+            mean = np.where(angles & (count > 0), np.degrees(np.arctan2(sin, cos)) % 360, mean)
+            std = np.where(angles, np.degrees(np.sqrt(-2 * np.log(resultant))), std)
+
+        report = {}
+        for i, name in enumerate(self.names):
+            report[name] = {
+                'count': int(count[i]),
+                'mean': float(mean[i]),
+                'min': self._minima[i][0][1] if self._minima[i] else math.nan,
+                'max': self._maxima[i][0][1] if self._maxima[i] else math.nan,
+                'std': float(std[i]),
+            }
+        return report
@@ -0,0 +1,273 @@
+import os
+
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+
+from misb0601_decoder import misb0601_key_names
+
+# Numeric MISB0601 fields carried in each record by default
+DEFAULT_RECORD_KEYS = (2,) + tuple(range(5, 34)) + tuple(range(35, 47)) + (56, 57, 58)
+
+_MAGIC = 0x4B4C5652494E4731  # "KLVRING1"
+_HEADER_WORDS = 8
+_CAPACITY, _RECORD_SIZE, _KEY_COUNT, _WRITE_SEQUENCE, _OWNER_PID = 1, 2, 3, 4, 5
+
+
+def record_dtype(keys):
+    """
+    Build the NumPy structured dtype of one ring buffer record.
+
+    Every record holds its sequence number (starting at 1, 0 while being written), the packet
+    number, the stream offset of the packet and a float64 per MISB0601 key, NaN when the packet
+    lacked the field.
+
+    :param keys: The MISB0601 keys carried in each record.
+    :return: The record dtype, with fields named after misb0601_key_names.
+    """
+    fields = [('seq', np.uint64), ('packet_number', np.int64), ('offset', np.int64)]
+    fields += [(misb0601_key_names[key], np.float64) for key in keys]
+    return np.dtype(fields)
+
+
+def _layout(buf, capacity, key_count):
+    """
+    Split a shared memory buffer into its header, key list and record array.
+    """
+    header = np.ndarray((_HEADER_WORDS,), dtype=np.uint64, buffer=buf)
+    keys = np.ndarray((key_count,), dtype=np.uint64, buffer=buf, offset=_HEADER_WORDS * 8)
+    return header, keys, (_HEADER_WORDS + key_count) * 8
+
+
+class RingBufferPublisher:
+    """
+    Publishes decoded packets into a shared memory ring buffer read by other processes.
+
+    The segment starts with a header holding the capacity, the record layout and the
+    sequence number of the last published record, so readers only need the segment name.
+    Records have a fixed layout (see record_dtype) and are written in place: a record's
+    sequence number is cleared before its fields are written and set afterwards, and the
+    header sequence is advanced last. There is a single writer and no locking; readers that
+    fall more than `capacity` records behind detect the overrun and skip ahead.
+    """
+
+    def __init__(self, name=None, capacity=4096, keys=DEFAULT_RECORD_KEYS):
+        """
+        Initialize the RingBufferPublisher, creating the shared memory segment.
+
+        :param name: The name of the segment, or None for a generated one.
+        :param capacity: The number of records in the ring.
+        :param keys: The MISB0601 keys carried in each record.
+        """
+        self.keys = tuple(keys)
+        self.dtype = record_dtype(self.keys)
+        self.capacity = capacity
+        records_offset = (_HEADER_WORDS + len(self.keys)) * 8
+        self.shm = shared_memory.SharedMemory(name, create=True, size=records_offset + capacity * self.dtype.itemsize)
+        self.name = self.shm.name
+
+        self.header, key_array, offset = _layout(self.shm.buf, capacity, len(self.keys))
+        key_array[:] = self.keys
+        self.records = np.ndarray((capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=offset)
+        self.records['seq'] = 0
+        self.header[_CAPACITY] = capacity
+        self.header[_RECORD_SIZE] = self.dtype.itemsize
+        self.header[_KEY_COUNT] = len(self.keys)
+        self.header[_WRITE_SEQUENCE] = 0
+        self.header[_OWNER_PID] = os.getpid()
+        self.header[0] = _MAGIC
+
+        self._fields = {misb0601_key_names[key]: i + 3 for i, key in enumerate(self.keys)}
+        self.sequence = 0
+
+    def publish(self, packetNum, packet, offset=-1):
+        """
+        Publish one decoded packet, e.g. from KLVParser.decode_iter() or an on_packet callback.
+
+        :param packetNum: The packet number.
+        :param packet: The decoded packet. Fields that are missing or not numbers are stored as NaN.
+        :param offset: The stream offset of the packet, or -1 if unknown.
+        """
+        row = [float('NaN')] * (len(self.keys) + 3)
+        row[0] = 0
+        row[1] = packetNum
+        row[2] = offset
+        fields = self._fields
+        for name, value in packet.items():
+            index = fields.get(name)
+            if index is not None and isinstance(value, (int, float)):
+                row[index] = value
+
+        sequence = self.sequence + 1
+        slot = self.sequence % self.capacity
+        self.records['seq'][slot] = 0
+        self.records[slot] = tuple(row)
+        self.records['seq'][slot] = sequence
+        self.sequence = sequence
+        self.header[_WRITE_SEQUENCE] = sequence
+
+    def publish_all(self, packets):
+        """
+        Publish every packet from an iterable of (packet number, decoded packet) tuples.
+
+        :return: The number of packets published.
+        """
+        count = 0
+        for packetNum, packet in packets:
+            self.publish(packetNum, packet)
+            count += 1
+        return count
+
+    def publish_columns(self, columns):
+        """
+        Publish packets decoded by columns.read_columns, writing whole slices of the ring at once.
+
+        :param columns: A dictionary with 'packet_number' and 'offset' arrays and an array per
+            MISB0601 key. Keys of the ring missing from it are stored as NaN.
+        :return: The number of packets published.
+        """
+        count = len(columns['packet_number'])
+        written = 0
+        while written < count:
+            slot = self.sequence % self.capacity
+            size = min(count - written, self.capacity - slot)
+            chunk = self.records[slot:slot + size]
+            rows = slice(written, written + size)
+
+            chunk['seq'] = 0
+            chunk['packet_number'] = columns['packet_number'][rows]
+            chunk['offset'] = columns['offset'][rows] if 'offset' in columns else -1
+            for key in self.keys:
+                column = columns.get(key)
+                chunk[misb0601_key_names[key]] = column[rows] if column is not None else np.nan
+            chunk['seq'] = np.arange(self.sequence + 1, self.sequence + size + 1, dtype=np.uint64)
+
+            self.sequence += size
+            self.header[_WRITE_SEQUENCE] = self.sequence
+            written += size
+        return count
+
+    def close(self):
+        """Detach from and remove the shared memory segment."""
+        self.header = self.records = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RingBufferReader:
+    """
+    Reads records published by a RingBufferPublisher, possibly in another process.
+
+    Each reader keeps its own position, so any number of readers can follow one publisher.
+    A new reader starts at the oldest record still in the ring, or at the newest one with
+    `from_start=False`.
+    """
+
+    def __init__(self, name, from_start=True):
+        """
+        Initialize the RingBufferReader, attaching to an existing segment.
+
+        :param name: The name of the segment created by the publisher.
+        :param from_start: Whether to begin at the oldest record still available.
+        """
+        self.shm = shared_memory.SharedMemory(name)
+        header = np.ndarray((_HEADER_WORDS,), dtype=np.uint64, buffer=self.shm.buf)
+        if header[0] != _MAGIC:
+            self.shm.close()
+            raise ValueError(f"Shared memory segment {name} is not a KLV ring buffer")
+        if header[_OWNER_PID] != os.getpid():
+            # The publisher owns the segment; keep the resource tracker from removing it when this process exits
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.capacity = int(header[_CAPACITY])
+        self.header, key_array, offset = _layout(self.shm.buf, self.capacity, int(header[_KEY_COUNT]))
+        self.keys = tuple(int(key) for key in key_array)
+        self.dtype = record_dtype(self.keys)
+        if self.dtype.itemsize != self.header[_RECORD_SIZE]:
+            self.shm.close()
+            raise ValueError(f"Record layout of shared memory segment {name} does not match")
+        self.records = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=offset)
+
+        latest = int(self.header[_WRITE_SEQUENCE])
+        self.next_sequence = max(latest - self.capacity + 1, 0) if from_start else latest
+        self.records_lost = 0
+
+    def available(self):
+        """
+        :return: The number of published records not read yet, including any already overwritten.
+        """
+        return int(self.header[_WRITE_SEQUENCE]) - self.next_sequence
+
+    def read(self, max_records=None, copy=True):
+        """
+        Read the records published since the previous read.
+
+        Records the reader fell too far behind to read are skipped and counted in records_lost.
+        With `copy=False` and no wrap-around, the result is a view into shared memory with no
+        copy at all; it is only valid until the publisher laps it, which overwritten can check.
+
+        :param max_records: The most records to return, or None for all that are available.
+        :param copy: Whether to copy the records out of shared memory.
+        :return: A structured array of records with the dtype from record_dtype.
+        """
+        capacity = self.capacity
+        latest = int(self.header[_WRITE_SEQUENCE])
+        oldest = max(latest - capacity + 1, 0)
+        if self.next_sequence < oldest:
+            self.records_lost += oldest - self.next_sequence
+            self.next_sequence = oldest
+
+        end = latest
+        if max_records is not None:
+            end = min(end, self.next_sequence + max_records)
+        if end <= self.next_sequence:
+            return self.records[:0].copy()
+
+        first = self.next_sequence % capacity
+        count = end - self.next_sequence
+        if first + count <= capacity:
+            records = self.records[first:first + count]
+            if copy:
+                records = records.copy()
+        else:
+            records = np.concatenate((self.records[first:], self.records[:first + count - capacity]))
+
+        if copy or first + count > capacity:
+            # Drop records the publisher started overwriting while they were being copied
+            valid = records['seq'] == np.arange(self.next_sequence + 1, end + 1, dtype=np.uint64)
+            overwritten = max(int(self.header[_WRITE_SEQUENCE]) - capacity + 1 - self.next_sequence, 0)
+            valid[:overwritten] = False
+            if not valid.all():
+                lost = int(np.count_nonzero(~valid))
+                self.records_lost += lost
+                records = records[valid]
+
+        self.next_sequence = end
+        return records
+
+    def overwritten(self, sequence):
+        """
+        Check whether the publisher has overwritten, or is overwriting, a record.
+
+        Use it on records returned by read(copy=False) before trusting them, passing the
+        sequence number read from the record when it was returned.
+
+        :param sequence: The sequence number of the record.
+        :return: True if the record is no longer intact.
+        """
+        return sequence <= int(self.header[_WRITE_SEQUENCE]) - self.capacity + 1
+
+    def close(self):
+        """Detach from the shared memory segment."""
+        self.header = self.records = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,204 @@
+import os
+
+import numpy as np
+
+from columns import read_columns
+from decoder import get_decoder
+from footprint import FOOTPRINT_KEYS, compute_footprints, footprint_bounds, points_in_footprints
+
+INDEX_SUFFIX = '.fpidx.npz'
+
+
+class SpatialIndex:
+    """
+    A grid index over the ground footprints of the packets in a recording.
+
+    The globe is split into square cells of `cell_size` degrees. Each packet is listed
+    under every cell its footprint bounding box touches, stored as a sorted array of cell
+    ids with the matching packet rows, so a query is a handful of binary searches followed
+    by an exact, vectorized test on the candidate footprints. Query results are the byte
+    offsets of the matching packets in the recording.
+    """
+
+    def __init__(self, offsets, latitudes, longitudes, cell_size, source_size=None):
+        """
+        Initialize the SpatialIndex.
+
+        :param offsets: The byte offset of each packet in the recording.
+        :param latitudes: An (N, 4) array of footprint corner latitudes.
+        :param longitudes: An (N, 4) array of footprint corner longitudes.
+        :param cell_size: The grid cell size in degrees.
+        :param source_size: The size of the indexed recording in bytes, if known.
+        """
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_size = float(cell_size)
+        self.source_size = source_size
+        self.columns_per_row = int(np.ceil(360.0 / self.cell_size))
+        self.bounds = footprint_bounds(self.latitudes, self.longitudes)
+        self._build_cells()
+
+    def _cell_ranges(self, bounds):
+        """
+        Convert bounding boxes to inclusive ranges of cell rows and columns.
+
+        :param bounds: An (N, 4) array of (min lat, min lon, max lat, max lon).
+        :return: A tuple (row0, col0, row1, col1) of int64 arrays.
+        """
+        rows_total = int(np.ceil(180.0 / self.cell_size))
+        row0 = np.clip(np.floor((bounds[:, 0] + 90.0) / self.cell_size), 0, rows_total - 1).astype(np.int64)
+        row1 = np.clip(np.floor((bounds[:, 2] + 90.0) / self.cell_size), 0, rows_total - 1).astype(np.int64)
+        col0 = np.clip(np.floor((bounds[:, 1] + 180.0) / self.cell_size), 0, self.columns_per_row - 1).astype(np.int64)
+        col1 = np.clip(np.floor((bounds[:, 3] + 180.0) / self.cell_size), 0, self.columns_per_row - 1).astype(np.int64)
+        return row0, col0, row1, col1
+
+    def _build_cells(self):
+        """
+        Build the sorted (cell id, packet row) arrays from the footprint bounding boxes.
+        """
+        valid = np.flatnonzero(~np.isnan(self.bounds).any(axis=1))
+        row0, col0, row1, col1 = self._cell_ranges(self.bounds[valid])
+        heights = row1 - row0 + 1
+        widths = col1 - col0 + 1
+        counts = heights * widths
+
+        # Expand every packet into one entry per covered cell
+        packet_rows = np.repeat(valid, counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        local = np.arange(counts.sum(), dtype=np.int64) - first
+        width = np.repeat(widths, counts)
+        cell_rows = np.repeat(row0, counts) + local // width
+        cell_cols = np.repeat(col0, counts) + local % width
+        cells = cell_rows * self.columns_per_row + cell_cols
+
+        order = np.argsort(cells, kind='stable')
+        self.cells = cells[order]
+        self.cell_packets = packet_rows[order]
+
+    @classmethod
+    def build(cls, rawBinary, key, cell_size=0.01, use_lookup_tables=False):
+        """
+        Build an index from the raw binary data of a recording.
+
+        :param rawBinary: The raw binary data containing one or more KLV packets.
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param cell_size: The grid cell size in degrees.
+        :param use_lookup_tables: See Decoder.
+        :return: A SpatialIndex.
+        """
+        decoder = get_decoder(key, use_lookup_tables, True)
+        columns = read_columns(decoder, rawBinary, FOOTPRINT_KEYS)
+        latitudes, longitudes = compute_footprints(columns)
+        return cls(columns['offset'], latitudes, longitudes, cell_size, len(rawBinary))
+
+    @classmethod
+    def build_for_file(cls, path, key, cell_size=0.01, use_lookup_tables=False):
+        """
+        Build an index for a recording and save it next to the file.
+
+        :param path: The path of the recording.
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param cell_size: The grid cell size in degrees.
+        :param use_lookup_tables: See Decoder.
+        :return: A SpatialIndex.
+        """
+        with open(path, 'rb') as f:
+            rawBinary = f.read()
+        index = cls.build(rawBinary, key, cell_size, use_lookup_tables)
+        index.save(path + INDEX_SUFFIX)
+        return index
+
+    @classmethod
+    def load_for_file(cls, path, key, cell_size=0.01, use_lookup_tables=False):
+        """
+        Load the index saved next to a recording, rebuilding it if missing or stale.
+
+        :param path: The path of the recording.
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param cell_size: The grid cell size used if the index has to be rebuilt.
+        :param use_lookup_tables: See Decoder.
+        :return: A SpatialIndex.
+        """
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(path):
+            index = cls.load(index_path)
+            if index.source_size == os.path.getsize(path):
+                return index
+        return cls.build_for_file(path, key, cell_size, use_lookup_tables)
+
+    def save(self, path):
+        """
+        Save the index to an .npz file.
+
+        :param path: The path to write.
+        """
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                offsets=self.offsets,
+                latitudes=self.latitudes,
+                longitudes=self.longitudes,
+                cell_size=self.cell_size,
+                source_size=-1 if self.source_size is None else self.source_size,
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with save.
+
+        :param path: The path of the .npz file.
+        :return: A SpatialIndex.
+        """
+        with np.load(path) as saved:
+            source_size = int(saved['source_size'])
+            return cls(
+                saved['offsets'],
+                saved['latitudes'],
+                saved['longitudes'],
+                float(saved['cell_size']),
+                None if source_size < 0 else source_size,
+            )
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Collect the packet rows listed under the cells touched by a bounding box.
+
+        :return: A sorted array of unique packet rows.
+        """
+        row0, col0, row1, col1 = (int(v[0]) for v in self._cell_ranges(
+            np.array([[min_lat, min_lon, max_lat, max_lon]], dtype=np.float64)))
+        base = np.arange(row0, row1 + 1, dtype=np.int64) * self.columns_per_row
+        lo = np.searchsorted(self.cells, base + col0, side='left')
+        hi = np.searchsorted(self.cells, base + col1, side='right')
+        if len(lo) == 1:
+            return np.unique(self.cell_packets[lo[0]:hi[0]])
+        return np.unique(np.concatenate([self.cell_packets[a:b] for a, b in zip(lo, hi)]))
+
+    def query_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Find the packets whose footprint bounding box intersects a bounding box.
+
+        :return: A sorted array of packet byte offsets.
+        """
+        rows = self._candidates(min_lat, min_lon, max_lat, max_lon)
+        bounds = self.bounds[rows]
+        hits = (
+            (bounds[:, 0] <= max_lat) & (bounds[:, 2] >= min_lat) &
+            (bounds[:, 1] <= max_lon) & (bounds[:, 3] >= min_lon)
+        )
+        return self.offsets[rows[hits]]
+
+    def query_point(self, lat, lon):
+        """
+        Find the packets whose footprint contains a point.
+
+        :return: A sorted array of packet byte offsets.
+        """
+        rows = self._candidates(lat, lon, lat, lon)
+        hits = points_in_footprints(self.latitudes[rows], self.longitudes[rows], lat, lon)
+        return self.offsets[rows[hits]]
+
+    def __len__(self):
+        return len(self.offsets)
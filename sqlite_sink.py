@@ -0,0 +1,242 @@
+import json
+import math
+import re
+import sqlite3
+
+from misb0601_decoder import decode_misb0601_item, misb0601_key_names
+
+# Keys stored in their own tables rather than as packet columns
+NESTED_SET_TABLES = {48: 'security_sets', 74: 'vmti_sets'}
+
+
+def _column_name(name):
+    return re.sub(r'[^0-9a-z]+', '_', name.lower()).strip('_')
+
+
+def _column_type(key):
+    """
+    Derive the SQLite type of a MISB0601 field from what its decoder returns for a zero value.
+    """
+    try:
+        sample = decode_misb0601_item(key, bytes(8))
+    except Exception:
+        return ''
+    if isinstance(sample, bool):
+        return ''
+    if isinstance(sample, (int, float)):
+        return 'REAL'
+    if isinstance(sample, str):
+        return 'TEXT'
+    return ''
+
+
+def packet_columns():
+    """
+    Build the packet table columns from misb0601_key_names.
+
+    :return: A list of (MISB0601 key, descriptive name, column name, column type) tuples.
+    """
+    columns = []
+    used = set()
+    for key, name in sorted(misb0601_key_names.items()):
+        if key == 1 or key in NESTED_SET_TABLES:
+            continue
+        column = _column_name(name)
+        if column in used:
+            column = f"{column}_{key}"
+        used.add(column)
+        columns.append((key, name, column, _column_type(key)))
+    return columns
+
+
+# Types bound as they are; SQLite itself stores a NaN float as NULL
+_PLAIN_TYPES = frozenset([float, int, str, bytes, type(None)])
+
+_json_encoder = json.JSONEncoder(default=lambda v: v.hex() if isinstance(v, (bytes, bytearray)) else str(v))
+
+
+def _to_sql(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (dict, list)):
+        return _json_encoder.encode(value)
+    return value
+
+
+class SQLiteSink:
+    """
+    Writes decoded packets to a SQLite database in large batches.
+
+    Packets go to a `packets` table with one column per MISB0601 field, derived from
+    misb0601_key_names. Security and VMTI local sets go to `security_sets` and `vmti_sets`
+    as JSON arrays referencing the packet row. The database runs in WAL mode and each batch
+    is written with executemany inside a single transaction.
+
+    Encoders repeat the same field layout packet after packet, so rows are grouped by
+    layout. Each layout gets an INSERT naming only the columns it holds, prepared once
+    together with the positions of its columns and nested sets. A packet is then written
+    by picking its values by position, without binding NULL for every absent field.
+    Indexes on Precision Time Stamp and frame center latitude/longitude are created when
+    the sink is closed, so they are built once after the bulk load rather than updated
+    per row.
+    """
+
+    def __init__(self, path, recording=None, batch_size=5000):
+        """
+        Initialize the SQLiteSink.
+
+        :param path: The path of the SQLite database. It is created if missing.
+        :param recording: An optional name stored with every packet, e.g. the source file.
+        :param batch_size: The number of packets written per transaction.
+        """
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.recording = recording
+        self.batch_size = batch_size
+        self.columns = packet_columns()
+        self._column_index = {name: i for i, (key, name, column, type_) in enumerate(self.columns)}
+        self._nested_names = {misb0601_key_names[key]: table for key, table in NESTED_SET_TABLES.items()}
+        self._create_tables()
+
+        # Field layout (tuple of descriptive names) -> (INSERT statement, column positions, nested set positions)
+        self._layouts = {}
+        self._insert_nested = {
+            table: f"INSERT INTO {table} (packet_id, items) VALUES (?, ?)" for table in NESTED_SET_TABLES.values()
+        }
+
+        self.next_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM packets').fetchone()[0]
+        self._queued = 0
+        # INSERT statement -> queued rows
+        self._packet_rows = {}
+        self._nested_rows = {table: [] for table in NESTED_SET_TABLES.values()}
+        self.packets_written = 0
+
+    def _create_tables(self):
+        column_definitions = ', '.join(f"{column} {type_}".rstrip() for key, name, column, type_ in self.columns)
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS packets (id INTEGER PRIMARY KEY, recording TEXT, packet_number INTEGER, {column_definitions})"
+        )
+        for table in NESTED_SET_TABLES.values():
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (packet_id INTEGER NOT NULL REFERENCES packets(id), items TEXT)"
+            )
+
+    def create_indexes(self):
+        """
+        Create the time, position and nested set indexes if they do not exist yet.
+        """
+        columns = {key: column for key, name, column, type_ in self.columns}
+        self.connection.execute(f"CREATE INDEX IF NOT EXISTS packets_time ON packets ({columns[2]})")
+        self.connection.execute(
+            f"CREATE INDEX IF NOT EXISTS packets_frame_center ON packets ({columns[23]}, {columns[24]})"
+        )
+        for table in NESTED_SET_TABLES.values():
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_packet ON {table} (packet_id)")
+
+    def _plan_layout(self, layout):
+        """
+        Prepare the INSERT statement and value positions of a field layout.
+        """
+        positions = []
+        column_names = []
+        for position, name in enumerate(layout):
+            index = self._column_index.get(name)
+            if index is not None:
+                positions.append(position)
+                column_names.append(self.columns[index][2])
+        nested = [(position, self._nested_names[name]) for position, name in enumerate(layout)
+                  if name in self._nested_names]
+        columns = ''.join(f", {column}" for column in column_names)
+        placeholders = ', ?' * len(column_names)
+        statement = f"INSERT INTO packets (id, recording, packet_number{columns}) VALUES (?, ?, ?{placeholders})"
+        plan = (statement, None if len(positions) == len(layout) else positions, nested)
+        self._layouts[layout] = plan
+        self._packet_rows.setdefault(statement, [])
+        return plan
+
+    def write(self, packetNum, packet):
+        """
+        Queue one decoded packet, writing the batch once it is full.
+
+        :param packetNum: The packet number.
+        :param packet: The decoded packet.
+        """
+        packet_id = self.next_id
+        self.next_id += 1
+
+        layout = tuple(packet)
+        plan = self._layouts.get(layout)
+        if plan is None:
+            plan = self._plan_layout(layout)
+        statement, positions, nested = plan
+
+        values = list(packet.values())
+        row = [packet_id, self.recording, packetNum]
+        if positions is None:
+            row += values
+        else:
+            row += [values[position] for position in positions]
+        plain_types = _PLAIN_TYPES
+        for i in range(3, len(row)):
+            if type(row[i]) not in plain_types:
+                row[i] = _to_sql(row[i])
+        self._packet_rows[statement].append(row)
+        for position, table in nested:
+            self._nested_rows[table].append((packet_id, _to_sql(values[position])))
+
+        self._queued += 1
+        if self._queued >= self.batch_size:
+            self.flush()
+
+    def write_all(self, packets):
+        """
+        Write every packet from an iterable of (packet number, decoded packet) tuples,
+        such as KLVParser.decode_iter() or Decoder.decode_iter().
+
+        :return: The number of packets written.
+        """
+        count = 0
+        for packetNum, packet in packets:
+            self.write(packetNum, packet)
+            count += 1
+        self.flush()
+        return count
+
+    def flush(self):
+        """
+        Write all queued packets in one transaction.
+        """
+        if not self._queued:
+            return
+        connection = self.connection
+        connection.execute('BEGIN')
+        try:
+            for statement, rows in self._packet_rows.items():
+                if rows:
+                    connection.executemany(statement, rows)
+            for table, rows in self._nested_rows.items():
+                if rows:
+                    connection.executemany(self._insert_nested[table], rows)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self.packets_written += self._queued
+        self._queued = 0
+        self._packet_rows = {statement: [] for statement in self._packet_rows}
+        self._nested_rows = {table: [] for table in NESTED_SET_TABLES.values()}
+
+    def close(self):
+        """
+        Write queued packets, build the indexes and close the database.
+        """
+        self.flush()
+        self.create_indexes()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from decoder import StreamState, get_decoder
+from packet_callbacks import LatencyHistogram, PacketDispatcher
+
+
+class FeedStats:
+    """
+    Running counters for a single feed.
+    """
+
+    def __init__(self):
+        self.first_arrival = None
+        self.last_arrival = None
+        self.bytes_received = 0
+        self.bytes_dropped = 0
+        self.packets = 0
+        self.decode_seconds = 0.0
+        # Arrival-to-decode latency of every packet
+        self.latency = LatencyHistogram()
+
+    def as_dict(self, feed):
+        """
+        Summarize the counters, including rates derived from them.
+
+        :param feed: The Feed the stats belong to.
+        :return: A dictionary of statistics for the feed.
+        """
+        elapsed = 0.0
+        if self.first_arrival is not None:
+            elapsed = self.last_arrival - self.first_arrival
+        latency = self.latency.summary()
+        return {
+            'packets': self.packets,
+            'bytes_received': self.bytes_received,
+            'bytes_dropped': self.bytes_dropped,
+            'bytes_buffered': len(feed.buffer) - feed.state.offset,
+            'checksum_failures': feed.state.checksum_failures,
+            'decode_seconds': self.decode_seconds,
+            'packets_per_second': self.packets / elapsed if elapsed > 0 else 0.0,
+            'bytes_per_second': self.bytes_received / elapsed if elapsed > 0 else 0.0,
+            'mean_latency': latency['mean'],
+            'p50_latency': latency['p50'],
+            'p99_latency': latency['p99'],
+            'max_latency': latency['max'],
+        }
+
+
+class Feed:
+    """
+    The buffer, decoding state and statistics of one KLV feed handled by a StreamManager.
+    """
+
+    def __init__(self, feed_id, max_buffer_bytes, on_packet=None):
+        """
+        Initialize the Feed.
+
+        :param feed_id: The identifier of the feed.
+        :param max_buffer_bytes: The most undecoded bytes kept for the feed. Older bytes are dropped beyond this.
+        :param on_packet: Optional callable(feed_id, packet_number, packet) called for each decoded packet.
+        """
+        self.feed_id = feed_id
+        self.max_buffer_bytes = max_buffer_bytes
+        # Callbacks fired as each packet of the feed is decoded, see PacketDispatcher
+        self.dispatcher = PacketDispatcher()
+        if on_packet is not None:
+            self.dispatcher.subscribe(lambda packetNum, packet: on_packet(feed_id, packetNum, packet))
+        self.buffer = bytearray()
+        self.state = StreamState()
+        self.stats = FeedStats()
+        # (absolute end offset, arrival time) of each pushed chunk not yet fully decoded
+        self.arrivals = deque()
+        self.pending = False
+        self.lock = threading.Lock()
+
+    def push(self, data, arrival_time):
+        """
+        Append received bytes to the feed, enforcing its memory limit.
+
+        :param data: The received bytes.
+        :param arrival_time: The time.perf_counter() value at which the bytes arrived.
+        """
+        with self.lock:
+            self.state.compact(self.buffer)
+            self.buffer += data
+
+            # Drop the oldest bytes when the feed is over its limit; decoding resynchronizes on the next key
+            excess = len(self.buffer) - self.max_buffer_bytes
+            if excess > 0:
+                del self.buffer[:excess]
+                self.state.base_offset += excess
+                self.stats.bytes_dropped += excess
+
+            # Chunks ending before the scan position can no longer complete a packet
+            arrivals = self.arrivals
+            base_offset = self.state.base_offset
+            while arrivals and arrivals[0][0] <= base_offset:
+                arrivals.popleft()
+            arrivals.append((base_offset + len(self.buffer), arrival_time))
+            stats = self.stats
+            if stats.first_arrival is None:
+                stats.first_arrival = arrival_time
+            stats.last_arrival = arrival_time
+            stats.bytes_received += len(data)
+            self.pending = True
+
+    def arrival_of(self, end_offset):
+        """
+        Return the arrival time of the chunk that completed a packet.
+
+        :param end_offset: The absolute stream offset just past the end of the packet.
+        :return: The time.perf_counter() value at which the packet's last byte arrived.
+        """
+        arrivals = self.arrivals
+        while len(arrivals) > 1 and arrivals[0][0] < end_offset:
+            arrivals.popleft()
+        return arrivals[0][1]
+
+
+class StreamManager:
+    """
+    Decodes many concurrent KLV feeds in one process.
+
+    Each feed keeps its own buffer, StreamState and statistics, while all feeds share a
+    single Decoder. Work is scheduled round-robin: every call to run_once decodes at most
+    `quantum` packets from each feed with pending data before moving to the next, so a
+    bursty feed cannot starve the others. Bytes may be pushed from other threads while
+    decoding is running.
+    """
+
+    def __init__(self, key, use_lookup_tables=False, use_templates=True, max_buffer_bytes=1 << 20, quantum=8):
+        """
+        Initialize the StreamManager.
+
+        :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+        :param use_lookup_tables: See Decoder.
+        :param use_templates: See Decoder.
+        :param max_buffer_bytes: The default per-feed limit on buffered, undecoded bytes.
+        :param quantum: The most packets decoded from one feed per scheduling round.
+        """
+        self.decoder = get_decoder(key, use_lookup_tables, use_templates)
+        self.max_buffer_bytes = max_buffer_bytes
+        self.quantum = quantum
+        self.feeds = {}
+        self._lock = threading.Lock()
+
+    def add_feed(self, feed_id, on_packet=None, max_buffer_bytes=None):
+        """
+        Register a new feed.
+
+        :param feed_id: The identifier of the feed.
+        :param on_packet: Optional callable(feed_id, packet_number, packet) called for each decoded packet.
+        :param max_buffer_bytes: The memory limit for this feed, defaulting to the manager's limit.
+        :return: The new Feed.
+        """
+        with self._lock:
+            if feed_id in self.feeds:
+                raise ValueError(f"Feed {feed_id} is already registered")
+            feed = Feed(feed_id, max_buffer_bytes or self.max_buffer_bytes, on_packet)
+            self.feeds[feed_id] = feed
+        return feed
+
+    def remove_feed(self, feed_id):
+        """
+        Unregister a feed, discarding any undecoded bytes.
+
+        :param feed_id: The identifier of the feed.
+        """
+        with self._lock:
+            del self.feeds[feed_id]
+
+    def push(self, feed_id, data, arrival_time=None):
+        """
+        Hand received bytes to a feed.
+
+        :param feed_id: The identifier of the feed.
+        :param data: The received bytes.
+        :param arrival_time: The time.perf_counter() value at which the bytes arrived, defaulting to now.
+        """
+        if arrival_time is None:
+            arrival_time = time.perf_counter()
+        self.feeds[feed_id].push(data, arrival_time)
+
+    def run_once(self):
+        """
+        Run one fair scheduling round over all feeds with pending data.
+
+        :return: A list of (feed id, packet number, decoded packet) tuples, in decode order.
+        """
+        decoded = []
+        with self._lock:
+            feeds = list(self.feeds.values())
+
+        for feed in feeds:
+            if feed.pending:
+                self._decode_feed(feed, decoded)
+
+        return decoded
+
+    def drain(self):
+        """
+        Run scheduling rounds until no feed has complete packets left to decode.
+
+        :return: A list of (feed id, packet number, decoded packet) tuples, in decode order.
+        """
+        decoded = []
+        while True:
+            batch = self.run_once()
+            if not batch:
+                return decoded
+            decoded.extend(batch)
+
+    def stats(self):
+        """
+        Report per-feed statistics.
+
+        :return: A dictionary keyed by feed id of FeedStats.as_dict results.
+        """
+        with self._lock:
+            feeds = list(self.feeds.values())
+        report = {}
+        for feed in feeds:
+            with feed.lock:
+                report[feed.feed_id] = feed.stats.as_dict(feed)
+        return report
+
+    def _decode_feed(self, feed, decoded):
+        """
+        Decode up to one quantum of packets from a feed.
+
+        The feed's on_packet callbacks run after its lock is released, so they may push to
+        their own feed.
+
+        :param feed: The Feed to decode from.
+        :param decoded: The list decoded packets are appended to.
+        """
+        decoder = self.decoder
+        quantum = self.quantum
+        dispatched = []
+        with feed.lock:
+            state = feed.state
+            stats = feed.stats
+            count = 0
+            start = time.perf_counter()
+            for packetNum, groupStartIndex, endIndex, items in islice(
+                    decoder.iter_packets(feed.buffer, state), quantum):
+                packet = decoder.decode_packet(items)
+                arrival_time = feed.arrival_of(state.base_offset + endIndex)
+                stats.latency.record(time.perf_counter() - arrival_time)
+                dispatched.append((packetNum, packet, arrival_time))
+                decoded.append((feed.feed_id, packetNum, packet))
+                count += 1
+            stats.packets += count
+            stats.decode_seconds += time.perf_counter() - start
+
+            # Fewer packets than the quantum means the buffer has no complete packet left
+            if count < quantum:
+                feed.pending = False
+
+        if feed.dispatcher.subscribers:
+            for packetNum, packet, arrival_time in dispatched:
+                feed.dispatcher.dispatch(packetNum, packet, arrival_time)
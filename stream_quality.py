@@ -0,0 +1,230 @@
+import mmap
+
+import numpy as np
+
+from decoder import get_decoder, read_precision_time_stamp
+
+
+def index_packets(decoder, data):
+    """
+    Locate every complete packet in data without tokenizing it.
+
+    A corrupted length does not hide the packets after it: scanning resynchronizes on the next
+    key, see Decoder.iter_packet_bounds with complete=True.
+
+    :param decoder: The Decoder whose key identifies packets.
+    :param data: A bytes-like buffer holding the whole recording.
+    :return: A tuple of int64 arrays (start, value start, end) of the packets.
+    """
+    bounds = np.array(list(decoder.iter_packet_bounds(data, complete=True)), dtype=np.int64).reshape(-1, 3)
+    return bounds[:, 0], bounds[:, 1], bounds[:, 2]
+
+
+def _strided_sums(view, starts, ends):
+    """
+    Sum view[starts[i]:ends[i]] for non-overlapping, ordered, non-empty ranges with one reduceat.
+    """
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    indices = np.empty(2 * len(starts), dtype=np.int64)
+    indices[0::2] = starts
+    indices[1::2] = ends
+    # The segment after the last index runs to the end of the view
+    if indices[-1] >= len(view):
+        indices = indices[:-1]
+    return np.add.reduceat(view, indices, dtype=np.int64)[0::2]
+
+
+def verify_checksums(data, starts, value_starts, ends):
+    """
+    Verify the MISB0601 checksums of located packets, vectorized across packets.
+
+    The 16-bit checksum weights bytes at even offsets from the packet start by 256. Sums of
+    the bytes at even and odd file offsets are taken for all packets at once with
+    np.add.reduceat, then swapped for packets starting at an odd offset.
+
+    :param data: A bytes-like buffer holding the recording.
+    :param starts: The start offsets of the packets.
+    :param value_starts: The value start offsets of the packets.
+    :param ends: The end offsets of the packets.
+    :return: A tuple of boolean arrays (valid, checked). Packets whose last item is not a
+        2-byte checksum are not checked and count as valid.
+    """
+    array = np.frombuffer(data, dtype=np.uint8)
+    checked = (ends - value_starts >= 4)
+    checked[checked] = (array[ends[checked] - 4] == 1) & (array[ends[checked] - 3] == 2)
+
+    # The checksum covers everything up to its own 2-byte value
+    stops = ends - 2
+    even_sums = _strided_sums(array[0::2], (starts + 1) // 2, (stops + 1) // 2)
+    odd_sums = _strided_sums(array[1::2], starts // 2, stops // 2)
+    odd_start = (starts % 2).astype(bool)
+    high = np.where(odd_start, odd_sums, even_sums)
+    low = np.where(odd_start, even_sums, odd_sums)
+    calculated = ((high << 8) + low) & 0xFFFF
+
+    provided = (array[ends - 2].astype(np.int64) << 8) | array[ends - 1]
+    valid = ~checked | (calculated == provided)
+    return valid, checked
+
+
+def read_time_stamps(data, value_starts, ends):
+    """
+    Read the raw Precision Time Stamp of every packet.
+
+    Packets starting with an 8-byte key 2 item, as encoders write them, are read with one
+    vectorized gather; the others fall back to read_precision_time_stamp.
+
+    :param data: A bytes-like buffer holding the recording.
+    :param value_starts: The value start offsets of the packets.
+    :param ends: The end offsets of the packets.
+    :return: An int64 array of time stamps in microseconds, -1 where a packet has none.
+    """
+    array = np.frombuffer(data, dtype=np.uint8)
+    time_stamps = np.full(len(value_starts), -1, dtype=np.int64)
+    leading = (ends - value_starts >= 10)
+    leading[leading] = (array[value_starts[leading]] == 2) & (array[value_starts[leading] + 1] == 8)
+
+    offsets = value_starts[leading][:, np.newaxis] + 2 + np.arange(8)
+    time_stamps[leading] = np.ascontiguousarray(array[offsets]).view('>u8').ravel().astype(np.int64)
+    for i in np.flatnonzero(~leading).tolist():
+        time_stamp = read_precision_time_stamp(data, int(value_starts[i]), int(ends[i]))
+        # A corrupted length can yield a value too large to be a time stamp
+        if time_stamp is not None and time_stamp < 2**63:
+            time_stamps[i] = time_stamp
+    return time_stamps
+
+
+def _merge_ranges(starts, ends):
+    """Merge sorted, possibly touching [start, end) ranges."""
+    if len(starts) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+    ends = np.maximum.accumulate(ends[order])
+    new_range = np.ones(len(starts), dtype=bool)
+    new_range[1:] = starts[1:] > ends[:-1]
+    groups = np.cumsum(new_range) - 1
+    merged_ends = np.zeros(groups[-1] + 1, dtype=np.int64)
+    np.maximum.at(merged_ends, groups, ends)
+    return np.column_stack((starts[new_range], merged_ends))
+
+
+class StreamQualityReport:
+    """
+    Timing and integrity statistics of one recording, see analyze_quality.
+    """
+
+    def __init__(self, size, starts, ends, valid, checked, time_stamps, gap_factor):
+        self.size = size
+        self.packets_found = len(starts)
+        self.checksum_failures = int(np.count_nonzero(~valid))
+        self.unchecked_packets = int(np.count_nonzero(~checked))
+
+        # Bytes outside any packet and packets failing their checksum
+        gap_starts = np.concatenate(([0], ends))
+        gap_ends = np.concatenate((starts, [size]))
+        has_gap = gap_ends > gap_starts
+        self.lost_ranges = _merge_ranges(
+            np.concatenate((gap_starts[has_gap], starts[~valid])),
+            np.concatenate((gap_ends[has_gap], ends[~valid])),
+        )
+        self.lost_bytes = int((self.lost_ranges[:, 1] - self.lost_ranges[:, 0]).sum())
+
+        times = time_stamps[valid]
+        self.packets = len(times)
+        self.missing_time_stamps = int(np.count_nonzero(times < 0))
+        times = times[times >= 0]
+        intervals = np.diff(times) / 1e6
+        forward = intervals[intervals > 0]
+
+        self.duration = float((times.max() - times.min()) / 1e6) if len(times) else 0.0
+        self.packet_rate = (len(times) - 1) / self.duration if self.duration > 0 else 0.0
+        self.median_interval = float(np.median(forward)) if len(forward) else 0.0
+        self.interval_jitter = float(np.std(forward)) if len(forward) else 0.0
+        self.duplicate_time_stamps = int(np.count_nonzero(intervals == 0))
+        self.out_of_order_time_stamps = int(np.count_nonzero(intervals < 0))
+
+        is_gap = intervals > gap_factor * self.median_interval if self.median_interval > 0 else np.zeros(len(intervals), dtype=bool)
+        self.gap_starts = times[:-1][is_gap]
+        self.gap_durations = intervals[is_gap]
+
+    def as_dict(self, max_ranges=20):
+        """
+        Summarize the report compactly, listing only the largest gaps and lost byte ranges.
+
+        :param max_ranges: The most gaps and lost byte ranges listed.
+        :return: A JSON-serializable dictionary.
+        """
+        largest_gaps = np.argsort(self.gap_durations)[::-1][:max_ranges]
+        lost_lengths = self.lost_ranges[:, 1] - self.lost_ranges[:, 0]
+        largest_lost = np.sort(np.argsort(lost_lengths)[::-1][:max_ranges])
+        return {
+            'bytes': self.size,
+            'packets_found': self.packets_found,
+            'packets': self.packets,
+            'checksum_failures': self.checksum_failures,
+            'unchecked_packets': self.unchecked_packets,
+            'lost_bytes': self.lost_bytes,
+            'lost_ranges': len(self.lost_ranges),
+            'missing_time_stamps': self.missing_time_stamps,
+            'duration': self.duration,
+            'packet_rate': self.packet_rate,
+            'median_interval': self.median_interval,
+            'interval_jitter': self.interval_jitter,
+            'duplicate_time_stamps': self.duplicate_time_stamps,
+            'out_of_order_time_stamps': self.out_of_order_time_stamps,
+            'gaps': len(self.gap_durations),
+            'gap_seconds': float(self.gap_durations.sum()),
+            'largest_gaps': [
+                {'start_time_stamp': int(self.gap_starts[i]), 'seconds': float(self.gap_durations[i])} for i in largest_gaps
+            ],
+            'largest_lost_ranges': self.lost_ranges[largest_lost].tolist(),
+        }
+
+
+def analyze_quality(data, key, gap_factor=3.0):
+    """
+    Grade the metadata quality of a recording without decoding its fields.
+
+    Packets are located by their key and BER length only. Their checksums and Precision Time
+    Stamps are then checked with array operations over the whole file. The result reports:
+    - the packet rate, and the median and jitter of the intervals between time stamps
+    - gaps, i.e. intervals longer than gap_factor times the median interval
+    - duplicate and out-of-order time stamps
+    - the byte ranges lost to corruption, i.e. bytes outside any packet plus packets
+      failing their checksum
+
+    :param data: A bytes-like buffer holding the recording.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param gap_factor: How many median intervals a gap must exceed.
+    :return: A StreamQualityReport.
+    """
+    decoder = get_decoder(key, False, False)
+    starts, value_starts, ends = index_packets(decoder, data)
+    valid, checked = verify_checksums(data, starts, value_starts, ends)
+    time_stamps = read_time_stamps(data, value_starts, ends)
+    return StreamQualityReport(len(data), starts, ends, valid, checked, time_stamps, gap_factor)
+
+
+def analyze_file(path, key, gap_factor=3.0):
+    """
+    Grade a recording on disk, memory-mapping it rather than reading it into memory.
+
+    :param path: The path of the recording.
+    :param key: The UAS LDS Key (a sequence of bytes) used to identify MISB0601 packets.
+    :param gap_factor: How many median intervals a gap must exceed.
+    :return: A StreamQualityReport.
+    """
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return analyze_quality(b'', key, gap_factor)
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return analyze_quality(data, key, gap_factor)
+        finally:
+            try:
+                data.close()
+            except BufferError:
+                # Arrays of a failed analysis still view the mapping; it is unmapped once they are freed
+                pass
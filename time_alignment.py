@@ -0,0 +1,99 @@
+import numpy as np
+
+from misb0601_decoder import misb0601_angle_keys
+
+# Precision Time Stamp
+TIME_KEY = 2
+
+# Headings and azimuths that wrap around at 360 degrees: Platform Heading Angle,
+# Sensor Relative Azimuth Angle, Wind Direction, Platform Magnetic Heading and
+# Alternate Platform Heading
+ANGLE_KEYS = misb0601_angle_keys
+
+# Numeric fields that are enumerations, codes or counters and must not be blended: Icing
+# Detected, Laser PRF Code and UAS Datalink LS Version Number. Event Start Time UTC
+# changes in steps, so a blend of two start times is no event's start either.
+NEAREST_KEYS = frozenset([34, 62, 65, 72])
+
+# Columns describing packets rather than metadata fields
+_PACKET_COLUMNS = frozenset(['packet_number', 'offset', 'end'])
+
+
+def interpolate_to_frames(columns, frame_times, time_key=TIME_KEY):
+    """
+    Resample decoded metadata columns at video frame times.
+
+    Numeric fields are linearly interpolated between the two packets around each frame
+    time, all at once as a single matrix operation. Heading and azimuth fields are
+    interpolated along the shorter way around the circle, and strings, enumerations and
+    nested sets take the value of the nearest packet. Frame times outside the recorded
+    span take the first or last packet's values. Where only one neighboring packet has a
+    value, that value is used.
+
+    :param columns: Decoded columns keyed by MISB0601 key, as returned by
+        columns.decode_columns, including the Precision Time Stamp column.
+    :param frame_times: The frame timestamps, in the units of the decoded Precision Time Stamp.
+    :param time_key: The key of the time column.
+    :return: A dictionary of arrays of length len(frame_times) keyed like columns, with the
+        time column replaced by frame_times.
+    """
+    frame_times = np.asarray(frame_times, dtype=np.float64)
+    times = np.asarray(columns[time_key], dtype=np.float64)
+
+    # Order packets by time and drop those without a time stamp
+    order = np.argsort(times, kind='stable')
+    order = order[~np.isnan(times[order])]
+    times = times[order]
+    if len(times) == 0:
+        raise ValueError("No packets with a Precision Time Stamp to interpolate from")
+
+    # Bracketing packets and blend weights for every frame
+    upper = np.clip(np.searchsorted(times, frame_times, side='left'), 0, len(times) - 1)
+    lower = np.clip(upper - 1, 0, len(times) - 1)
+    span = times[upper] - times[lower]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weight = np.where(span > 0, (frame_times - times[lower]) / span, 0.0)
+    weight = np.clip(weight, 0.0, 1.0)
+    nearest = np.where(weight < 0.5, lower, upper)
+
+    linear_keys = []
+    angle_keys = []
+    result = {time_key: frame_times}
+    for key, column in columns.items():
+        if key == time_key or key in _PACKET_COLUMNS:
+            continue
+        column = np.asarray(column)[order]
+        if column.dtype == object or key in NEAREST_KEYS:
+            result[key] = column[nearest]
+        elif key in ANGLE_KEYS:
+            angle_keys.append(key)
+        else:
+            linear_keys.append(key)
+
+    w = weight[:, np.newaxis]
+    if linear_keys:
+        values = np.column_stack([np.asarray(columns[key], dtype=np.float64)[order] for key in linear_keys])
+        low = values[lower]
+        high = values[upper]
+        blended = _fill_missing(low + (high - low) * w, low, high)
+        for i, key in enumerate(linear_keys):
+            result[key] = blended[:, i]
+
+    if angle_keys:
+        values = np.column_stack([np.asarray(columns[key], dtype=np.float64)[order] for key in angle_keys])
+        low = values[lower]
+        high = values[upper]
+        delta = (high - low + 180.0) % 360.0 - 180.0
+        blended = _fill_missing((low + delta * w) % 360.0, low, high)
+        for i, key in enumerate(angle_keys):
+            result[key] = blended[:, i]
+
+    return result
+
+
+def _fill_missing(blended, low, high):
+    """
+    Use the available neighbor where only one of the two bracketing packets has a value.
+    """
+    blended = np.where(np.isnan(low), high, blended)
+    return np.where(np.isnan(high), low, blended)